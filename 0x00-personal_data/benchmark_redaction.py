@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for PII redaction engines.
+
+Generates synthetic `key=value;` log lines of varying field count and value
+length, checks that every engine produces exactly the output of the
+reference per-field `re.sub` implementation, then reports lines/sec and
+per-record latency percentiles.
+
+Usage: ./benchmark_redaction.py [--records N] [--fields 5,10,20]
+                                [--value-length 8,64] [--seed S]
+"""
+
+import argparse
+import logging
+import random
+import re
+import string
+import time
+from typing import Callable, Dict, List, Sequence
+
+from filtered_logger import (PII_FIELDS, RedactingFormatter, filter_datum,
+                             format_fields)
+
+
+REDACTION = RedactingFormatter.REDACTION
+SEPARATOR = RedactingFormatter.SEPARATOR
+VALUE_ALPHABET = string.ascii_letters + string.digits + "@.-:()/ "
+
+
+def reference_filter_datum(fields: List[str], redaction: str,
+                           message: str, separator: str) -> str:
+    """
+    The original one-substitution-per-field implementation, used as the
+    specification every engine must match.
+    """
+    for field in fields:
+        message = re.sub(
+            rf"{field}=.*?{separator}",
+            f"{field}={redaction}{separator}",
+            message
+        )
+    return message
+
+
+def make_records(count: int, field_count: int, value_length: int,
+                 rng: random.Random) -> List[str]:
+    """
+    Builds synthetic log lines mixing PII and non-PII fields.
+    """
+    names = list(PII_FIELDS)
+    names += ["field_{}".format(i) for i in range(field_count - len(names))]
+    names = names[:field_count]
+
+    records = []
+    for _ in range(count):
+        rng.shuffle(names)
+        pairs = []
+        for name in names:
+            value = "".join(rng.choice(VALUE_ALPHABET)
+                            for _ in range(rng.randint(1, value_length)))
+            pairs.append("{}={}".format(name, value))
+        records.append("; ".join(pairs) + SEPARATOR)
+    return records
+
+
+def formatter_engine() -> Callable[[str], str]:
+    """
+    Redacts through RedactingFormatter, returning only the message part.
+    """
+    formatter = RedactingFormatter(fields=list(PII_FIELDS))
+
+    def run(message: str) -> str:
+        record = logging.LogRecord("user_data", logging.INFO, __file__, 0,
+                                   message, None, None)
+        formatter.format(record)
+        return record.msg
+    return run
+
+
+def structured_engine() -> Callable[[str], str]:
+    """
+    Redacts by key through format_fields. The line is split back into a
+    mapping first so that every engine takes the same input; callers that
+    already hold a mapping skip that cost.
+    """
+    fields = frozenset(PII_FIELDS)
+
+    def run(message: str) -> str:
+        mapping = dict(pair.split("=", 1)
+                       for pair in message[:-1].split(SEPARATOR + " "))
+        return format_fields(mapping, fields, REDACTION, SEPARATOR)
+    return run
+
+
+ENGINES: Dict[str, Callable[[], Callable[[str], str]]] = {
+    "reference": lambda: lambda message: reference_filter_datum(
+        list(PII_FIELDS), REDACTION, message, SEPARATOR),
+    "filter_datum": lambda: lambda message: filter_datum(
+        list(PII_FIELDS), REDACTION, message, SEPARATOR),
+    "formatter": formatter_engine,
+    "structured": structured_engine,
+}
+
+
+def percentile(sorted_values: Sequence[int], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted sequence.
+    """
+    index = min(len(sorted_values) - 1,
+                max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def check(engine: Callable[[str], str], records: List[str]) -> int:
+    """
+    Returns the number of records whose output differs from the reference.
+    """
+    mismatches = 0
+    for message in records:
+        expected = reference_filter_datum(list(PII_FIELDS), REDACTION,
+                                          message, SEPARATOR)
+        if engine(message) != expected:
+            mismatches += 1
+    return mismatches
+
+
+def measure(engine: Callable[[str], str], records: List[str]) -> dict:
+    """
+    Times the engine over every record.
+    """
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for message in records:
+        before = clock()
+        engine(message)
+        latencies.append(clock() - before)
+    elapsed = (clock() - start) / 1e9
+
+    latencies.sort()
+    return {
+        "lines_per_sec": len(records) / elapsed,
+        "p50_us": percentile(latencies, 50) / 1000,
+        "p95_us": percentile(latencies, 95) / 1000,
+        "p99_us": percentile(latencies, 99) / 1000,
+    }
+
+
+def main() -> None:
+    """Runs every engine over every record shape and prints a table."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--fields", default="5,10,20",
+                        help="comma separated field counts")
+    parser.add_argument("--value-length", default="8,64",
+                        help="comma separated maximum value lengths")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    header = "{:<14}{:>7}{:>7}{:>14}{:>10}{:>10}{:>10}  {}".format(
+        "engine", "fields", "len", "lines/sec", "p50 us", "p95 us",
+        "p99 us", "check")
+    print(header)
+    print("-" * len(header))
+
+    failed = False
+    for field_count in (int(n) for n in args.fields.split(",")):
+        for value_length in (int(n) for n in args.value_length.split(",")):
+            records = make_records(args.records, field_count, value_length,
+                                   rng)
+            for name, factory in ENGINES.items():
+                engine = factory()
+                mismatches = check(engine, records)
+                failed = failed or mismatches > 0
+                stats = measure(engine, records)
+                print("{:<14}{:>7}{:>7}{:>14,.0f}{:>10.2f}{:>10.2f}"
+                      "{:>10.2f}  {}".format(
+                          name, field_count, value_length,
+                          stats["lines_per_sec"], stats["p50_us"],
+                          stats["p95_us"], stats["p99_us"],
+                          "ok" if not mismatches else
+                          "{} mismatches".format(mismatches)))
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
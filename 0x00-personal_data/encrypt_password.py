@@ -3,21 +3,32 @@
 Password hashing and validation utility.
 """
 
+import os
+from concurrent.futures import (Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from typing import Iterable, List, Optional, Tuple
+
 import bcrypt
 
 
-def hash_password(password: str) -> bytes:
+DEFAULT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> bytes:
     """
     Hash a password using bcrypt with automatic salting.
 
     Args:
         password (str): The password to hash.
+        rounds (int): The bcrypt cost factor, defaults to BCRYPT_ROUNDS
+            from the environment (12 if unset).
 
     Returns:
         bytes: The salted and hashed password.
     """
     password_bytes = password.encode('utf-8')
-    return bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+    salt = bcrypt.gensalt(rounds if rounds is not None else DEFAULT_ROUNDS)
+    return bcrypt.hashpw(password_bytes, salt)
 
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
@@ -32,3 +43,70 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
         bool: True if password matches hashed_password, False otherwise.
     """
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
+
+
+class HashingService:
+    """
+    Runs bcrypt hashing and verification on a pool of workers.
+
+    bcrypt releases the GIL while hashing, so the default thread pool
+    already uses every core; use_processes switches to a process pool.
+    Every call returns futures so callers can submit a whole batch and
+    collect the results later.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 rounds: Optional[int] = None,
+                 use_processes: bool = False):
+        """
+        Initialize the worker pool.
+
+        Args:
+            max_workers (int): Pool size, defaults to the number of CPUs.
+            rounds (int): The bcrypt cost factor used by hash/hash_many.
+            use_processes (bool): Use a process pool instead of threads.
+        """
+        self.rounds = rounds if rounds is not None else DEFAULT_ROUNDS
+        workers = max_workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor: Executor = pool(max_workers=workers)
+
+    def hash(self, password: str) -> Future:
+        """
+        Submit one password for hashing.
+        """
+        return self._executor.submit(hash_password, password, self.rounds)
+
+    def verify(self, hashed_password: bytes, password: str) -> Future:
+        """
+        Submit one password for verification against its hash.
+        """
+        return self._executor.submit(is_valid, hashed_password, password)
+
+    def hash_many(self, passwords: Iterable[str]) -> List[Future]:
+        """
+        Submit a batch of passwords, returning one future per password.
+        """
+        return [self.hash(password) for password in passwords]
+
+    def verify_many(self, pairs: Iterable[Tuple[bytes, str]]
+                    ) -> List[Future]:
+        """
+        Submit a batch of (hashed_password, password) pairs, returning one
+        future per pair.
+        """
+        return [self.verify(hashed, password) for hashed, password in pairs]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker pool.
+        """
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "HashingService":
+        """Use the service as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Shut the pool down on exit."""
+        self.shutdown()
@@ -3,29 +3,98 @@
 Logging module for filtering PII data.
 """
 
+import argparse
+import atexit
+import copy
 import logging
+import logging.handlers
+import multiprocessing
+import queue
 import re
-from typing import List
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import (Collection, Dict, Iterable, Iterator, List, Mapping,
+                    Optional, Pattern, TextIO, Tuple)
 import os
 import mysql.connector
+from mysql.connector import errors, pooling
 from mysql.connector.connection import MySQLConnection
 
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
 
 
+@lru_cache(maxsize=64)
+def compile_redaction(fields: Tuple[str, ...], redaction: str,
+                      separator: str) -> Tuple[Tuple[Pattern, str], ...]:
+    """
+    Precompiles one (pattern, replacement) rule per PII field.
+
+    A single alternation redacting every field in one pass was rejected:
+    with Python's re engine it is no faster than the original per-field
+    loop, while separate literal-prefixed patterns, compiled once, are
+    (see benchmark_redaction.py).
+    """
+    sep = re.escape(separator)
+    return tuple(
+        (re.compile(rf"{re.escape(field)}=.*?{sep}"),
+         (f"{field}={redaction}{separator}").replace("\\", "\\\\"))
+        for field in fields
+    )
+
+
+def redact(rules: Tuple[Tuple[Pattern, str], ...], message: str) -> str:
+    """
+    Obfuscates a message with rules built by compile_redaction.
+    """
+    for pattern, replacement in rules:
+        message = pattern.sub(replacement, message)
+    return message
+
+
 def filter_datum(fields: List[str], redaction: str,
                  message: str, separator: str) -> str:
     """
     Obfuscates PII fields in a log message.
     """
-    for field in fields:
-        message = re.sub(
-            rf"{field}=.*?{separator}",
-            f"{field}={redaction}{separator}",
-            message
-        )
-    return message
+    return redact(compile_redaction(tuple(fields), redaction, separator),
+                  message)
+
+
+def format_pairs(pairs: Iterable[Tuple[str, object]],
+                 fields: Collection[str], redaction: str,
+                 separator: str) -> str:
+    """
+    Serializes (key, value) pairs as 'key=value; key=value;', replacing the
+    value of every PII field by key lookup instead of re-parsing a string.
+    """
+    return (separator + " ").join(
+        f"{k}={redaction if k in fields else v}" for k, v in pairs
+    ) + separator
+
+
+def format_fields(mapping: Mapping[str, object], fields: Collection[str],
+                  redaction: str, separator: str) -> str:
+    """
+    Serializes a field mapping with format_pairs.
+    """
+    return format_pairs(mapping.items(), fields, redaction, separator)
+
+
+def _db_config() -> Dict[str, Optional[str]]:
+    """
+    Reads the database credentials from environment variables.
+    """
+    return {
+        "user": os.getenv("PERSONAL_DATA_DB_USERNAME", "root"),
+        "password": os.getenv("PERSONAL_DATA_DB_PASSWORD", ""),
+        "host": os.getenv("PERSONAL_DATA_DB_HOST", "localhost"),
+        "database": os.getenv("PERSONAL_DATA_DB_NAME"),
+    }
 
 
 def get_db() -> MySQLConnection:
@@ -33,17 +102,64 @@ def get_db() -> MySQLConnection:
     Connects to a secure Holberton MySQL database using credentials from
     environment variables and returns a MySQLConnection object.
     """
-    username = os.getenv("PERSONAL_DATA_DB_USERNAME", "root")
-    password = os.getenv("PERSONAL_DATA_DB_PASSWORD", "")
-    host = os.getenv("PERSONAL_DATA_DB_HOST", "localhost")
-    database = os.getenv("PERSONAL_DATA_DB_NAME")
+    return mysql.connector.connect(**_db_config())
 
-    return mysql.connector.connect(
-        user=username,
-        password=password,
-        host=host,
-        database=database
-    )
+
+_pool: Optional[pooling.MySQLConnectionPool] = None
+_connection_born: Dict[int, float] = {}
+
+
+def get_pool() -> pooling.MySQLConnectionPool:
+    """
+    Returns the process-wide connection pool, creating it on first use.
+
+    The pool holds PERSONAL_DATA_DB_POOL_SIZE connections (default 5,
+    at most 32 as enforced by mysql.connector).
+    """
+    global _pool
+    if _pool is None:
+        size = int(os.getenv("PERSONAL_DATA_DB_POOL_SIZE", "5"))
+        _pool = pooling.MySQLConnectionPool(pool_name="personal_data",
+                                            pool_size=size,
+                                            **_db_config())
+    return _pool
+
+
+@contextmanager
+def pooled_db() -> Iterator[pooling.PooledMySQLConnection]:
+    """
+    Checks a healthy connection out of the pool and returns it on exit.
+
+    When every connection is in use, waits up to
+    PERSONAL_DATA_DB_POOL_TIMEOUT seconds (default 10) before raising
+    PoolError. Connections that no longer answer a ping, or are older than
+    PERSONAL_DATA_DB_POOL_RECYCLE seconds (default 3600), are reconnected
+    before being handed out.
+    """
+    timeout = float(os.getenv("PERSONAL_DATA_DB_POOL_TIMEOUT", "10"))
+    recycle = float(os.getenv("PERSONAL_DATA_DB_POOL_RECYCLE", "3600"))
+    deadline = time.monotonic() + timeout
+
+    while True:
+        try:
+            db = get_pool().get_connection()
+            break
+        except errors.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+    try:
+        now = time.monotonic()
+        born = _connection_born.get(db.connection_id, now)
+        if now - born > recycle or not db.is_connected():
+            _connection_born.pop(db.connection_id, None)
+            db.reconnect()
+            born = time.monotonic()
+        _connection_born[db.connection_id] = born
+        yield db
+    finally:
+        db.close()
 
 
 class RedactingFormatter(logging.Formatter):
@@ -58,19 +174,81 @@ class RedactingFormatter(logging.Formatter):
     def __init__(self, fields: List[str]):
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self._field_set = frozenset(fields)
+        self._rules = compile_redaction(tuple(fields), self.REDACTION,
+                                        self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
         """
         Format log record and redact PII fields.
+
+        A dict message is treated as structured data: its PII values are
+        replaced by key and it is serialized once. Any other message goes
+        through filter_datum style redaction.
         """
-        record.msg = filter_datum(self.fields, self.REDACTION,
-                                  record.getMessage(), self.SEPARATOR)
+        if isinstance(record.msg, Mapping):
+            record.msg = format_fields(record.msg, self._field_set,
+                                       self.REDACTION, self.SEPARATOR)
+        else:
+            record.msg = redact(self._rules, record.getMessage())
         return super(RedactingFormatter, self).format(record)
 
 
-def get_logger() -> logging.Logger:
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that either drops or blocks when its queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue, block: bool = False):
+        super(BoundedQueueHandler, self).__init__(log_queue)
+        self.block = block
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Keep structured (dict) messages intact so that the listener's
+        RedactingFormatter can still redact them by key.
+        """
+        if isinstance(record.msg, Mapping):
+            return copy.copy(record)
+        return super(BoundedQueueHandler, self).prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Put the record on the queue, counting it as dropped if the queue
+        is full and the handler is not blocking.
+        """
+        if self.block:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RedactingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener whose shutdown sentinel waits for room in a full queue.
+    """
+
+    def enqueue_sentinel(self) -> None:
+        """
+        Block until the stop sentinel fits behind the pending records.
+        """
+        self.queue.put(self._sentinel)
+
+
+def get_logger(use_queue: bool = False, queue_size: int = 10000,
+               block: bool = False) -> logging.Logger:
     """
     Returns a logger named 'user_data' with a custom redacting formatter.
+
+    With use_queue, records are handed to a bounded queue and a background
+    QueueListener thread redacts and writes them. When the queue is full
+    records are dropped, or the caller waits if block is True. The listener
+    is stopped, and the queue flushed, at interpreter exit or by calling
+    stop_logger().
     """
     logger = logging.getLogger("user_data")
     logger.setLevel(logging.INFO)
@@ -78,14 +256,281 @@ def get_logger() -> logging.Logger:
 
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(RedactingFormatter(fields=list(PII_FIELDS)))
-    logger.addHandler(stream_handler)
+
+    if not use_queue:
+        logger.addHandler(stream_handler)
+        return logger
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = BoundedQueueHandler(log_queue, block=block)
+    listener = RedactingQueueListener(log_queue, stream_handler)
+    queue_handler.listener = listener
+    logger.addHandler(queue_handler)
+    listener.start()
+    atexit.register(stop_logger, logger)
 
     return logger
 
 
-def main() -> None:
+def stop_logger(logger: logging.Logger) -> None:
+    """
+    Flushes and stops the background listeners of a queue-backed logger.
+    """
+    for handler in list(logger.handlers):
+        listener = getattr(handler, "listener", None)
+        if listener is None or listener._thread is None:
+            continue
+        listener.stop()
+        for target in listener.handlers:
+            target.flush()
+
+
+def export_users(db: MySQLConnection, stream: TextIO = sys.stdout,
+                 batch_size: int = 1000,
+                 progress: Optional[TextIO] = sys.stderr,
+                 key: Optional[str] = None, lower: object = None,
+                 upper: object = None, offset: Optional[int] = None,
+                 limit: Optional[int] = None) -> int:
+    """
+    Streams the users table through the redacting formatter.
+
+    Rows are pulled with an unbuffered cursor in batches of batch_size and
+    each line is built straight from the column names and the row tuple,
+    redacted by column name. The RedactingFormatter prefix (logger, level,
+    time) is formatted once per batch, and the lines of a batch are
+    written to stream in one call, so memory stays constant whatever the
+    table size. A rows/sec counter is written to progress
+    after every batch. With key (a unique, non-null indexed column), rows
+    are exported in key order, restricted to lower <= key < upper when
+    those bounds are given. With limit instead, the limit rows following
+    the first offset ones are exported, in the order of all_columns_order.
+    Returns the number of rows.
+    """
+    order = all_columns_order(db) if limit is not None else None
+    cursor = db.cursor(buffered=False)
+    if order is not None:
+        cursor.execute("SELECT * FROM users ORDER BY {} LIMIT %s "
+                       "OFFSET %s;".format(order), (limit, offset or 0))
+    elif key is None:
+        cursor.execute("SELECT * FROM users;")
+    else:
+        conditions, params = [], []
+        if lower is not None:
+            conditions.append("{} >= %s".format(_quote(key)))
+            params.append(lower)
+        if upper is not None:
+            conditions.append("{} < %s".format(_quote(key)))
+            params.append(upper)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        cursor.execute("SELECT * FROM users{} ORDER BY {};".format(
+            where, _quote(key)), tuple(params))
+    columns = [desc[0] for desc in cursor.description]
+
+    formatter = RedactingFormatter(fields=list(PII_FIELDS))
+    fields = formatter._field_set
+    redaction, separator = formatter.REDACTION, formatter.SEPARATOR
+    total = 0
+    start = time.monotonic()
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        prefix = formatter.format(logging.LogRecord(
+            "user_data", logging.INFO, __file__, 0, "", None, None))
+        stream.write("\n".join(
+            prefix + format_pairs(zip(columns, row), fields, redaction,
+                                  separator)
+            for row in rows) + "\n")
+
+        total += len(rows)
+        if progress is not None:
+            elapsed = max(time.monotonic() - start, 1e-9)
+            progress.write("\r{} rows, {:.0f} rows/sec".format(
+                total, total / elapsed))
+            progress.flush()
+
+    if progress is not None and total:
+        progress.write("\n")
+    cursor.close()
+    return total
+
+
+def _quote(column: str) -> str:
+    """
+    Quotes a column name as a MySQL identifier.
+    """
+    return "`{}`".format(column.replace("`", "``"))
+
+
+def shard_key(db: MySQLConnection) -> Optional[str]:
+    """
+    Returns a column of users that can split the table into keyset
+    ranges: the only column of a unique index on non-null values, the
+    primary key first. None if the table has no such index.
+    """
+    cursor = db.cursor()
+    cursor.execute(
+        "SELECT INDEX_NAME, COLUMN_NAME, NULLABLE "
+        "FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users' "
+        "AND NON_UNIQUE = 0;")
+    indexes: Dict[str, List[Tuple[str, str]]] = {}
+    for index_name, column, nullable in cursor.fetchall():
+        indexes.setdefault(index_name, []).append((column, nullable))
+    cursor.close()
+
+    for index_name in sorted(indexes, key=lambda name: name != "PRIMARY"):
+        columns = indexes[index_name]
+        if len(columns) == 1 and columns[0][1] != "YES":
+            return columns[0][0]
+    return None
+
+
+def all_columns_order(db: MySQLConnection) -> str:
+    """
+    Returns an ORDER BY list of every column of users, compared as bytes:
+    a total order that needs no key, identical rows being
+    interchangeable.
+    """
+    cursor = db.cursor()
+    cursor.execute("SELECT * FROM users LIMIT 0;")
+    columns = [desc[0] for desc in cursor.description]
+    cursor.fetchall()
+    cursor.close()
+    return ", ".join("CAST({} AS BINARY)".format(_quote(column))
+                     for column in columns)
+
+
+def offset_bounds(db: MySQLConnection,
+                  workers: int) -> List[Tuple[int, int]]:
+    """
+    Splits users into at most workers (offset, limit) ranges of about the
+    same size, for tables without a column shard_key can use.
+    """
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users;")
+    (count,) = cursor.fetchone()
+    cursor.close()
+    parts = max(1, min(workers, count))
+    edges = [index * count // parts for index in range(parts + 1)]
+    return [(lower, upper - lower) for lower, upper in
+            zip(edges[:-1], edges[1:])]
+
+
+def shard_bounds(db: MySQLConnection, key: str,
+                 workers: int) -> List[Tuple[object, object]]:
+    """
+    Splits users into at most workers contiguous [lower, upper) key
+    ranges of about the same size; None stands for an open end.
+
+    Split points are read from the key index alone (ORDER BY key LIMIT 1
+    OFFSET n), so workers never scan rows outside their own range.
+    """
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users;")
+    (count,) = cursor.fetchone()
+    splits = []
+    for index in range(1, min(workers, count)):
+        cursor.execute("SELECT {0} FROM users ORDER BY {0} LIMIT 1 "
+                       "OFFSET %s;".format(_quote(key)),
+                       (index * count // workers,))
+        splits.append(cursor.fetchone()[0])
+    cursor.close()
+
+    edges = [None] + splits + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _export_shard(task: Tuple[str, int, Dict[str, object]]) -> int:
+    """
+    Worker entry point: exports one range of users to a shard file, the
+    range being export_users arguments (key, lower and upper, or offset
+    and limit). The range is read in a consistent snapshot.
+    """
+    shard_path, batch_size, bounds = task
+    db = get_db()
+    try:
+        db.start_transaction(consistent_snapshot=True, readonly=True)
+        with open(shard_path, "w") as shard:
+            total = export_users(db, shard, batch_size, None, **bounds)
+        db.commit()
+        return total
+    finally:
+        db.close()
+
+
+def parallel_export(workers: int, stream: TextIO = sys.stdout,
+                    batch_size: int = 1000,
+                    progress: Optional[TextIO] = sys.stderr) -> int:
+    """
+    Exports the users table with a pool of worker processes.
+
+    The table is split into one contiguous range per worker: a key range
+    on a unique, non-null indexed column when there is one (see
+    shard_key), else an offset range in the order of all_columns_order,
+    which makes every worker sort the table and assumes it doesn't
+    change during the export. Each worker opens its own get_db()
+    connection and writes its range, in order, to a shard file; shards
+    are concatenated to stream in range order, so every row is exported
+    exactly once. Returns the number of rows exported.
+    """
+    db = get_db()
+    try:
+        key = shard_key(db)
+        if key is not None:
+            ranges = [{"key": key, "lower": lower, "upper": upper}
+                      for lower, upper in shard_bounds(db, key, workers)]
+        else:
+            ranges = [{"offset": offset, "limit": limit}
+                      for offset, limit in offset_bounds(db, workers)]
+    finally:
+        db.close()
+
+    start = time.monotonic()
+    with tempfile.TemporaryDirectory() as shard_dir:
+        tasks = [
+            ("{}/shard_{:05d}.log".format(shard_dir, index), batch_size,
+             bounds)
+            for index, bounds in enumerate(ranges)
+        ]
+        with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+            total = sum(pool.map(_export_shard, tasks))
+
+        for shard_path, _, _ in tasks:
+            with open(shard_path, "r") as shard:
+                shutil.copyfileobj(shard, stream)
+
+    if progress is not None:
+        elapsed = max(time.monotonic() - start, 1e-9)
+        progress.write("{} rows, {:.0f} rows/sec ({} workers)\n".format(
+            total, total / elapsed, workers))
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """Main function that fetches and logs user data from the database."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--stream", action="store_true",
+                        help="stream redacted rows in batches to stdout")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="rows fetched per batch in stream mode")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="export with N worker processes (implies "
+                             "--stream)")
+    args = parser.parse_args(argv)
+
+    if args.workers > 0:
+        parallel_export(args.workers, batch_size=args.batch_size)
+        return
+
     db = get_db()
+
+    if args.stream:
+        export_users(db, batch_size=args.batch_size)
+        db.close()
+        return
+
     cursor = db.cursor()
     cursor.execute("SELECT * FROM users;")
 
@@ -95,11 +540,9 @@ def main() -> None:
     logger = get_logger()
 
     for row in cursor:
-        # Map column names to values
-        # build a log line like key=value; key=value; ...
-        row_dict = dict(zip(columns, row))
-        log_message = "; ".join(f"{k}={v}" for k, v in row_dict.items()) + ";"
-        logger.info(log_message)
+        # Map column names to values; the formatter redacts by key and
+        # builds a log line like key=value; key=value; ...
+        logger.info(dict(zip(columns, row)))
 
     cursor.close()
     db.close()
@@ -5,6 +5,10 @@ File: api/v1/app.py
 """
 from os import getenv
 from api.v1.views import app_views
+from api.v1.auth import get_auth
+from api.v1.auth.async_auth import UNRESOLVED, resolved_user
+from api.v1.auth.path_matcher import PathMatcher
+from models import metrics
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
 import os
@@ -13,40 +17,27 @@ import os
 app = Flask(__name__)
 app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
-auth = None
-
-auth_type = getenv("AUTH_TYPE")
-
-if auth_type == "basic_auth":
-    from api.v1.auth.basic_auth import BasicAuth
-    auth = BasicAuth()
-elif auth_type == "auth":
-    from api.v1.auth.auth import Auth
-    auth = Auth()
-elif auth_type == "session_auth":
-    from api.v1.auth.session_auth import SessionAuth
-    auth = SessionAuth()
-elif auth_type == "session_exp_auth":
-    from api.v1.auth.session_exp_auth import SessionExpAuth
-    auth = SessionExpAuth()
-if auth_type == "session_db_auth":
-    from api.v1.auth.session_db_auth import SessionDBAuth
-    auth = SessionDBAuth()
+auth = get_auth(getenv("AUTH_TYPE"))
+
+excluded_paths = PathMatcher([
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/',
+    '/api/v1/auth_session/login/'
+])
+
+
+AUTH_HANDLE_SECONDS = metrics.histogram(
+    "auth_handle_seconds", "Time spent in the before_request auth hook")
 
 
 @app.before_request
+@AUTH_HANDLE_SECONDS.timed()
 def auth_handle() -> str:
     """auth handle."""
     if auth is None:
         return
 
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/',
-        '/api/v1/auth_session/login/'
-    ]
-
     request.current_user = None
 
     if auth.require_auth(request.path, excluded_paths):
@@ -58,11 +49,9 @@ def auth_handle() -> str:
         if auth_header is None and session_id is None:
             abort(401)
 
-        # 3) Try to get a user from whichever is present
-        user = None
-        if auth_header:
-            user = auth.current_user(request)
-        elif session_id:
+        # 3) Get the user, unless the ASGI middleware resolved it already
+        user = resolved_user.get()
+        if user is UNRESOLVED:
             user = auth.current_user(request)
 
         # 4) If header/cookie was present but didn't map to a valid user
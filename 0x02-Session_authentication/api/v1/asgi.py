@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for the API
+File: api/v1/asgi.py
+
+The Flask app runs through a2wsgi's WSGIMiddleware, behind a
+middleware that authenticates each request with AsyncAuth: storage
+lookups and password hashing run in an executor while the event loop
+keeps serving other keep-alive connections. The resolved user is handed
+to auth_handle through a context variable.
+
+Each request runs the Flask app in a pool of WSGI_WORKERS threads
+(default 32), so slow requests don't wait for one another; the context
+of the request, the resolved user included, is copied to the thread.
+
+Requires a2wsgi and an ASGI server, e.g.:
+    pip install a2wsgi uvicorn
+    uvicorn api.v1.asgi:application --host 0.0.0.0 --port 5000
+"""
+from api.v1.app import app, auth, excluded_paths
+from api.v1.auth.async_auth import AsyncAuth, resolved_user
+from http.cookies import CookieError, SimpleCookie
+from os import getenv
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    WSGIMiddleware = None
+
+
+class ScopeRequest:
+    """The parts of a request the auth classes read, from an ASGI scope
+    """
+
+    def __init__(self, scope: dict):
+        """Reads path, headers and cookies from <scope>"""
+        self.path = scope.get("path", "")
+        self.headers = {}
+        for name, value in scope.get("headers", ()):
+            self.headers[name.decode("latin-1").title()] = \
+                value.decode("latin-1")
+        self.cookies = {}
+        if "Cookie" in self.headers:
+            cookie = SimpleCookie()
+            try:
+                cookie.load(self.headers["Cookie"])
+            except CookieError:
+                return
+            self.cookies = {name: morsel.value
+                            for name, morsel in cookie.items()}
+
+
+class AuthMiddleware:
+    """ASGI middleware resolving the user of each request with AsyncAuth
+    """
+
+    def __init__(self, app, auth, excluded_paths) -> None:
+        """Wraps the ASGI <app> with <auth> (an Auth or AsyncAuth)"""
+        self.app = app
+        if auth is not None and not isinstance(auth, AsyncAuth):
+            auth = AsyncAuth(auth)
+        self.auth = auth
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope, receive, send):
+        """Resolves the user, then runs the wrapped app"""
+        if scope["type"] != "http" or self.auth is None:
+            return await self.app(scope, receive, send)
+
+        request = ScopeRequest(scope)
+        if not self.auth.require_auth(request.path, self.excluded_paths):
+            return await self.app(scope, receive, send)
+        if self.auth.authorization_header(request) is None and \
+                self.auth.session_cookie(request) is None:
+            return await self.app(scope, receive, send)
+
+        user = await self.auth.current_user(request)
+        token = resolved_user.set(user)
+        try:
+            return await self.app(scope, receive, send)
+        finally:
+            resolved_user.reset(token)
+
+
+def wsgi_to_asgi(wsgi_app):
+    """Adapts a WSGI app to ASGI with a2wsgi, running it in a pool of
+    WSGI_WORKERS threads"""
+    if WSGIMiddleware is None:
+        raise ImportError("Serving the API over ASGI requires a2wsgi")
+    return WSGIMiddleware(wsgi_app,
+                          workers=int(getenv("WSGI_WORKERS", "32")))
+
+
+application = AuthMiddleware(wsgi_to_asgi(app), auth, excluded_paths)
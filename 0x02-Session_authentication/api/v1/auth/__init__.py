@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Authentication schemes of the API, selected by AUTH_TYPE"""
+from importlib import import_module
+from os import getenv
+
+# AUTH_TYPE value -> (module, class), imported on first use
+AUTH_SCHEMES = {
+    "auth": ("api.v1.auth.auth", "Auth"),
+    "basic_auth": ("api.v1.auth.basic_auth", "BasicAuth"),
+    "session_auth": ("api.v1.auth.session_auth", "SessionAuth"),
+    "session_exp_auth": ("api.v1.auth.session_exp_auth", "SessionExpAuth"),
+    "session_db_auth": ("api.v1.auth.session_db_auth", "SessionDBAuth"),
+}
+
+
+def create_scheme(name: str):
+    """Returns an instance of the scheme called <name>, None if unknown"""
+    if name not in AUTH_SCHEMES:
+        return None
+    module, cls = AUTH_SCHEMES[name]
+    return getattr(import_module(module), cls)()
+
+
+def get_auth(auth_type: str = None):
+    """Returns the authenticator selected by <auth_type> (AUTH_TYPE by
+    default): one scheme, or a ChainedAuth trying a comma-separated
+    list of schemes in order. None if no known scheme is selected.
+    """
+    if auth_type is None:
+        auth_type = getenv("AUTH_TYPE")
+    if not auth_type:
+        return None
+    names = [name.strip() for name in auth_type.split(",") if name.strip()]
+    schemes = [scheme for scheme in map(create_scheme, names)
+               if scheme is not None]
+    if not schemes:
+        return None
+    if len(schemes) == 1:
+        return schemes[0]
+    from api.v1.auth.chained_auth import ChainedAuth
+    return ChainedAuth(schemes)
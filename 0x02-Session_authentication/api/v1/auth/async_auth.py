@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Async interface over the authentication classes"""
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import ContextVar
+from os import getenv
+from typing import Optional, TypeVar
+import asyncio
+import functools
+
+UNRESOLVED = object()
+
+# User resolved ahead of the WSGI app by api.v1.asgi for the current
+# request; UNRESOLVED when auth_handle must call current_user itself
+resolved_user: ContextVar = ContextVar("resolved_user", default=UNRESOLVED)
+
+
+class AsyncAuth:
+    """Runs the blocking methods of an Auth instance in an executor
+
+    Storage lookups (SessionDBAuth) and password hashing (BasicAuth) run
+    in a thread pool of AUTH_EXECUTOR_WORKERS threads (default 32), so
+    the event loop keeps serving other connections meanwhile; hashlib
+    and bcrypt release the GIL while hashing. Other attributes are read
+    from the wrapped instance.
+    """
+
+    def __init__(self, auth, executor: Optional[Executor] = None) -> None:
+        """Wraps <auth>, using <executor> or a new thread pool"""
+        self.auth = auth
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=int(getenv("AUTH_EXECUTOR_WORKERS", "32")),
+                thread_name_prefix="auth")
+        self.executor = executor
+
+    def __getattr__(self, name: str):
+        """Delegates to the wrapped instance"""
+        return getattr(self.auth, name)
+
+    async def _run(self, func, *args):
+        """Awaits func(*args) run in the executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor,
+                                          functools.partial(func, *args))
+
+    async def current_user(self, request=None) -> TypeVar('User'):
+        """Returns the User of a request"""
+        return await self._run(self.auth.current_user, request)
+
+    async def create_session(self, user_id: str = None) -> Optional[str]:
+        """Creates a session for <user_id>"""
+        return await self._run(self.auth.create_session, user_id)
+
+    async def destroy_session(self, request=None) -> bool:
+        """Deletes the session of a request"""
+        return await self._run(self.auth.destroy_session, request)
+
+    def shutdown(self) -> None:
+        """Stops the executor"""
+        self.executor.shutdown(wait=True)
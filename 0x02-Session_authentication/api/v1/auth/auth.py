@@ -4,38 +4,60 @@ Class Auth
 file: api/v1/auth/auth.py
 """
 
+from api.v1.auth.path_matcher import PathMatcher, compile_paths
 from flask import request
-from typing import List, TypeVar
+from models import metrics
+from typing import List, TypeVar, Union
+import functools
 import os
+import time
+
+AUTH_SECONDS = metrics.histogram(
+    "auth_current_user_seconds",
+    "Time to resolve the user of a request, per auth scheme")
+AUTH_RESULTS = metrics.counter(
+    "auth_current_user_total",
+    "Requests resolved to a user or not, per auth scheme")
+
+
+def instrumented(current_user):
+    """Times a current_user method and counts its results, labelled
+    with the auth scheme (class name) of the instance"""
+    @functools.wraps(current_user)
+    def wrapper(self, request=None):
+        scheme = type(self).__name__
+        start = time.perf_counter()
+        user = current_user(self, request)
+        AUTH_SECONDS.observe(time.perf_counter() - start, scheme=scheme)
+        AUTH_RESULTS.inc(scheme=scheme,
+                         result="user" if user is not None else "anonymous")
+        return user
+    return wrapper
 
 
 class Auth:
     """Auth class"""
 
-    def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
-        """Return False (placeholder for auth logic)"""
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Instruments the current_user method a scheme defines"""
+        super().__init_subclass__(**kwargs)
+        if "current_user" in cls.__dict__:
+            cls.current_user = instrumented(cls.__dict__["current_user"])
+
+    def __init__(self) -> None:
+        """Reads the configuration once: SESSION_NAME"""
+        self.session_name = os.getenv("SESSION_NAME")
+
+    def require_auth(self, path: str,
+                     excluded_paths: Union[List[str], PathMatcher]) -> bool:
+        """Returns False if <path> is in <excluded_paths>, a list of paths
+        (compiled once per distinct list) or a PathMatcher"""
         if path is None or excluded_paths is None or not excluded_paths:
             return True
 
-        # Normalize the path to ensure trailing slash
-        if not path.endswith("/"):
-            path += "/"
-
-        # Normalize excluded paths
-        for excluded in excluded_paths:
-            if excluded.endswith('*'):
-                # Wildcard path prefix match
-                prefix = excluded[:-1]
-                if path.startswith(prefix):
-                    return False
-            else:
-                # Normalize to include trailing slash
-                if not excluded.endswith('/'):
-                    excluded += '/'
-                if path == excluded:
-                    return False
-
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = compile_paths(tuple(excluded_paths))
+        return not excluded_paths.match(path)
 
     def authorization_header(self, request=None) -> str:
         """Retrieve the Authorization header from the request"""
@@ -44,16 +66,27 @@ class Auth:
 
         return request.headers.get("Authorization")
 
+    def credentials(self, request=None):
+        """Returns the credential of this scheme carried by a request
+        (Authorization header or session cookie), None if absent"""
+        header = self.authorization_header(request)
+        if header is not None:
+            return header
+        return self.session_cookie(request)
+
     def current_user(self, request=None) -> TypeVar('User'):
         """Returns None (placeholder for user retrieval logic)"""
         return None
 
+    def destroy_all_sessions(self, user_id: str) -> int:
+        """Destroys every session of a user, returns how many"""
+        return 0
+
     def session_cookie(self, request=None):
         """Returns a cookie value from a request."""
         if request is None:
             return None
 
-        session_name = os.getenv("SESSION_NAME")
-        if session_name is None:
+        if self.session_name is None:
             return None
-        return request.cookies.get(session_name)
+        return request.cookies.get(self.session_name)
@@ -5,12 +5,85 @@ BasicAuth module
 
 from api.v1.auth.auth import Auth
 import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from models import metrics
 from models.user import User
-from typing import TypeVar
+from typing import Optional, TypeVar
+
+PARSE_SECONDS = metrics.histogram(
+    "basic_auth_parse_seconds",
+    "Time to extract and decode Basic auth credentials")
+VERIFY_SECONDS = metrics.histogram(
+    "password_verify_seconds", "Time to verify a password hash")
+CACHE_RESULTS = metrics.counter(
+    "basic_auth_cache_total", "Verified-credential cache hits and misses")
 
 
 class BasicAuth(Auth):
-    """BasicAuth class that inherits from Auth"""
+    """BasicAuth class that inherits from Auth
+
+    Verified credentials are cached for BASIC_AUTH_CACHE_TTL seconds
+    (default 60, 0 disables the cache), BASIC_AUTH_CACHE_SIZE entries at
+    most (default 1024), so clients sending the same credentials on
+    every request skip the password hash. Entries are keyed by an HMAC
+    of email and password under a per-process random key, so no
+    plaintext is kept. A hit is only served while the user still exists
+    with the same email and the same stored password hash.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the credential cache"""
+        super().__init__()
+        try:
+            self.cache_ttl = float(os.getenv("BASIC_AUTH_CACHE_TTL", "60"))
+            self.cache_size = int(os.getenv("BASIC_AUTH_CACHE_SIZE", "1024"))
+        except ValueError:
+            self.cache_ttl, self.cache_size = 60, 1024
+        self._cache_key = os.urandom(32)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _credential_key(self, user_email: str, user_pwd: str) -> bytes:
+        """Keyed digest of a pair of credentials"""
+        return hmac.new(self._cache_key,
+                        "{}\0{}".format(user_email, user_pwd).encode(),
+                        hashlib.sha256).digest()
+
+    def _cached_user(self, key: bytes, user_email: str) -> Optional[User]:
+        """Returns the user verified with these credentials, if still
+        cached and valid"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            user_id, stored, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+
+        user = User.get(user_id)
+        if user is None or user.email != user_email or \
+                user.password != stored:
+            with self._cache_lock:
+                self._cache.pop(key, None)
+            return None
+        return user
+
+    def _cache_user(self, key: bytes, user: User, stored: str) -> None:
+        """Remembers that these credentials were verified for <user>
+        against the password hash <stored>"""
+        with self._cache_lock:
+            self._cache[key] = (user.id, stored,
+                                time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
 
     def extract_base64_authorization_header(
         self, authorization_header: str
@@ -63,6 +136,10 @@ class BasicAuth(Auth):
 
         return (username, passwd)
 
+    def credentials(self, request=None) -> str:
+        """Returns the Authorization header of a request"""
+        return self.authorization_header(request)
+
     def user_object_from_credentials(self, user_email: str, user_pwd: str):
         """Returns the User instance based on email and password."""
         if user_email is None or not isinstance(user_email, str):
@@ -70,6 +147,14 @@ class BasicAuth(Auth):
         if user_pwd is None or not isinstance(user_pwd, str):
             return None
 
+        key = None
+        if self.cache_ttl > 0:
+            key = self._credential_key(user_email, user_pwd)
+            user = self._cached_user(key, user_email)
+            CACHE_RESULTS.inc(result="hit" if user is not None else "miss")
+            if user is not None:
+                return user
+
         try:
             users = User.search({'email': user_email})
         except Exception:
@@ -79,30 +164,28 @@ class BasicAuth(Auth):
             return None
 
         user = users[0]
-        if not user.is_valid_password(user_pwd):
+        stored = user.password
+        with VERIFY_SECONDS.time():
+            valid = user.is_valid_password(user_pwd)
+        if not valid:
             return None
 
+        if key is not None:
+            self._cache_user(key, user, stored)
         return user
 
     def current_user(self, request=None) -> TypeVar('User'):
         """Retrieves the User instance for a request."""
-        # Step 1: Get the authorization header
-        auth_header = self.authorization_header(request)
-        if auth_header is None:
-            return None
-
-        # Step 2: Extract the Base64 part
-        base64_part = self.extract_base64_authorization_header(auth_header)
-        if base64_part is None:
-            return None
-
-        # Step 3: Decode the Base64 string
-        decoded = self.decode_base64_authorization_header(base64_part)
-        if decoded is None:
-            return None
-
-        # Step 4: Extract user credentials
-        email, password = self.extract_user_credentials(decoded)
+        with PARSE_SECONDS.time():
+            # Step 1: Get the authorization header
+            auth_header = self.authorization_header(request)
+            # Step 2: Extract the Base64 part
+            base64_part = self.extract_base64_authorization_header(
+                auth_header)
+            # Step 3: Decode the Base64 string
+            decoded = self.decode_base64_authorization_header(base64_part)
+            # Step 4: Extract user credentials
+            email, password = self.extract_user_credentials(decoded)
         if email is None or password is None:
             return None
 
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Authentication trying several schemes in order"""
+
+from api.v1.auth.auth import Auth
+from typing import List, Optional, TypeVar
+
+
+class ChainedAuth(Auth):
+    """Tries each scheme in order, e.g. session cookie then Basic auth
+
+    A scheme is only asked for the user when the request carries its
+    kind of credential, so each scheme resolves at most once per request
+    and schemes without a credential cost nothing. Session methods go
+    to the first scheme providing them.
+    """
+
+    def __init__(self, schemes: List[Auth]) -> None:
+        """Initialize with the ordered list of <schemes>"""
+        super().__init__()
+        self.schemes = schemes
+
+    def __getattr__(self, name: str):
+        """Reads attributes missing here from the first scheme having
+        them"""
+        for scheme in self.__dict__.get("schemes", ()):
+            if hasattr(scheme, name):
+                return getattr(scheme, name)
+        raise AttributeError(name)
+
+    def current_user(self, request=None) -> TypeVar('User'):
+        """Returns the user of the first scheme that resolves one"""
+        for scheme in self.schemes:
+            if scheme.credentials(request) is None:
+                continue
+            user = scheme.current_user(request)
+            if user is not None:
+                return user
+        return None
+
+    def create_session(self, user_id: str = None) -> Optional[str]:
+        """Creates a session with the first session scheme"""
+        return self._session_scheme().create_session(user_id)
+
+    def _session_scheme(self) -> Auth:
+        """Returns the first scheme handling sessions"""
+        for scheme in self.schemes:
+            if hasattr(scheme, "create_session"):
+                return scheme
+        raise AttributeError("create_session")
+
+    def destroy_session(self, request=None) -> bool:
+        """Deletes the session of a request in every session scheme"""
+        destroyed = [scheme.destroy_session(request)
+                     for scheme in self.schemes
+                     if hasattr(scheme, "destroy_session")]
+        return any(destroyed)
+
+    def destroy_all_sessions(self, user_id: str) -> int:
+        """Deletes every session of a user in every scheme"""
+        return sum(scheme.destroy_all_sessions(user_id)
+                   for scheme in self.schemes)
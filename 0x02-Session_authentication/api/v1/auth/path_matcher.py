@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Compiled matcher for the paths excluded from authentication"""
+
+from functools import lru_cache
+from typing import Iterable
+
+_END = None  # Trie key marking the end of a wildcard prefix
+
+
+class PathMatcher:
+    """Matches a path against excluded paths in O(len(path))
+
+    Exact paths (normalized with a trailing slash) go in a set; wildcard
+    paths ending with '*' go in a character trie of their prefixes, so
+    the cost of a match doesn't depend on the number of rules.
+    """
+
+    def __init__(self, excluded_paths: Iterable[str]) -> None:
+        """Compiles <excluded_paths>"""
+        self.exact = set()
+        self.prefixes = {}
+        for excluded in excluded_paths:
+            if excluded.endswith('*'):
+                node = self.prefixes
+                for char in excluded[:-1]:
+                    node = node.setdefault(char, {})
+                node[_END] = True
+            else:
+                if not excluded.endswith('/'):
+                    excluded += '/'
+                self.exact.add(excluded)
+
+    def __bool__(self) -> bool:
+        """False if there is no rule"""
+        return bool(self.exact or self.prefixes)
+
+    def match(self, path: str) -> bool:
+        """Tells if <path> is excluded"""
+        if not path.endswith('/'):
+            path += '/'
+        if path in self.exact:
+            return True
+
+        node = self.prefixes
+        if _END in node:
+            return True
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
+
+
+@lru_cache(maxsize=64)
+def compile_paths(excluded_paths: tuple) -> PathMatcher:
+    """Returns the matcher of a tuple of excluded paths, compiled once"""
+    return PathMatcher(excluded_paths)
@@ -3,13 +3,42 @@
 """
 
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_store import get_session_store
+import threading
 import uuid
+from models import metrics
 from models.user import User
 
+SESSIONS_CREATED = metrics.counter(
+    "sessions_created_total", "Sessions created, per auth scheme")
+SESSIONS_DESTROYED = metrics.counter(
+    "sessions_destroyed_total", "Sessions destroyed, per auth scheme")
+SESSION_LOOKUPS = metrics.counter(
+    "session_lookups_total",
+    "Session ID lookups, per auth scheme and result "
+    "(found, missing, expired)")
+
 
 class SessionAuth(Auth):
-    """A class that inherits from Auth"""
+    """A class that inherits from Auth
+
+    Sessions live in the store selected by SESSION_STORE (see
+    api.v1.auth.session_store). The default memory store keeps them in
+    user_id_by_session_id; the sqlite and redis stores share them
+    between worker processes and across restarts.
+    """
     user_id_by_session_id = {}
+    session_ids_by_user_id = {}
+    # Guards the two dicts above, shared by every instance
+    session_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        """Opens the session store"""
+        super().__init__()
+        self.session_store = get_session_store(
+            SessionAuth.user_id_by_session_id,
+            SessionAuth.session_ids_by_user_id,
+            SessionAuth.session_lock)
 
     def create_session(self, user_id: str = None) -> str:
         """Creates a session ID for a <user_id>."""
@@ -17,20 +46,33 @@ class SessionAuth(Auth):
             return None
 
         session_id = str(uuid.uuid4())  # Converts UUID to string
-        # Stores user_id by in the dictonary with session_id as key.
-        SessionAuth.user_id_by_session_id[session_id] = user_id
+        self._store_session(session_id, user_id)
+        SESSIONS_CREATED.inc(scheme=type(self).__name__)
 
         return session_id
 
+    def _store_session(self, session_id: str, user_id: str) -> None:
+        """Stores user_id in the session store with session_id as key."""
+        self.session_store.set(session_id, user_id)
+
     def user_id_for_session_id(self, session_id: str = None) -> str:
         """Returns a User ID based on a Session ID."""
         if session_id is None or not isinstance(session_id, str):
             return None
 
-        user_id = SessionAuth.user_id_by_session_id.get(session_id)
+        user_id = self.session_store.get(session_id)
+        self._count_lookup("missing" if user_id is None else "found")
 
         return user_id
 
+    def _count_lookup(self, result: str) -> None:
+        """Counts a session lookup and its result"""
+        SESSION_LOOKUPS.inc(scheme=type(self).__name__, result=result)
+
+    def credentials(self, request=None) -> str:
+        """Returns the session cookie of a request"""
+        return self.session_cookie(request)
+
     def current_user(self, request=None):
         """Returns a User instance based on a cookie value."""
         session_id = self.session_cookie(request)
@@ -56,5 +98,15 @@ class SessionAuth(Auth):
         if user_id is None:
             return False
 
-        del self.user_id_by_session_id[session_id]
+        if not self.session_store.delete(session_id):
+            return False
+        SESSIONS_DESTROYED.inc(scheme=type(self).__name__)
         return True
+
+    def destroy_all_sessions(self, user_id: str) -> int:
+        """Deletes every session of a user (logout everywhere)"""
+        if user_id is None:
+            return 0
+        removed = self.session_store.delete_user(user_id)
+        SESSIONS_DESTROYED.inc(removed, scheme=type(self).__name__)
+        return removed
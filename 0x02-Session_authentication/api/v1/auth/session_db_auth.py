@@ -1,15 +1,158 @@
 #!/usr/bin/env python3
 """Session-based auth with DB persistence"""
 
+from api.v1.auth.session_auth import SESSIONS_DESTROYED
 from api.v1.auth.session_exp_auth import SessionExpAuth
+from models import metrics
+from models.base import storage
 from models.user_session import UserSession
-from typing import Optional
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from flask import request
+from os import getenv
+import sys
+import threading
+
+CACHE_RESULTS = metrics.counter(
+    "session_cache_total", "SessionDBAuth session cache hits and misses")
+CACHE_RELOADS = metrics.counter(
+    "session_cache_reloads_total",
+    "SessionDBAuth reloads after the stored sessions changed")
 
 
 class SessionDBAuth(SessionExpAuth):
-    """Session authentication that stores sessions in file"""
+    """Session authentication that stores sessions in file
+
+    Lookups go through an in-process LRU cache of session_id ->
+    (user_id, created_at) holding at most SESSION_CACHE_SIZE entries.
+    Entries expire with the session (SESSION_DURATION). The cache and
+    the loaded UserSession objects are refreshed only when the storage
+    generation of UserSession changes (file mtime, or the sqlite
+    generation counter), so a session destroyed by another worker
+    process is never served from a stale cache. Writes made by this
+    process move the generation too; they keep the cache, which they
+    update themselves, unless another process wrote since the last
+    reload.
+
+    The reaper is seeded with every stored session at startup and then
+    with the sessions this process creates. The expired UserSession
+    objects found by the batches of a sweep are removed together when
+    it ends, with a single write.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the session cache"""
+        super().__init__()
+        try:
+            self.cache_size = int(getenv("SESSION_CACHE_SIZE", "10000"))
+        except Exception:
+            self.cache_size = 10000
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._generation = None
+        self._loaded = False
+        self._reaped = []
+        self._reaped_lock = threading.Lock()
+
+    def _sync(self) -> None:
+        """Reload sessions and clear the cache if the store changed"""
+        generation = storage.generation(UserSession.__name__)
+        with self._cache_lock:
+            if self._loaded and generation == self._generation:
+                return
+            self._cache.clear()
+            self._generation = generation
+            self._loaded = True
+        CACHE_RELOADS.inc()
+        UserSession.load_from_file()
+
+    def _wrote(self, before) -> None:
+        """Adopts the generation left by a write of this process, made
+        when the storage generation was <before>"""
+        after = storage.generation(UserSession.__name__)
+        with self._cache_lock:
+            if self._loaded and before == self._generation:
+                self._generation = after
+
+    def _seed_reaper(self) -> None:
+        """Schedules every stored session"""
+        UserSession.load_from_file()
+        for session in UserSession.all():
+            created_at = getattr(session, 'created_at', None)
+            if created_at is None:
+                continue
+            expires = created_at + timedelta(seconds=self.session_duration)
+            self.reaper.schedule(
+                session.session_id,
+                expires.replace(tzinfo=timezone.utc).timestamp())
+
+    def _reap(self, session_ids: List[str],
+              now: float) -> Tuple[int, int]:
+        """Collects the stored sessions among <session_ids> expired at
+        <now> (epoch seconds) for _flush_reaped"""
+        _, freed = super()._reap(session_ids, now)
+        self._sync()
+        now = datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None)
+        expired = []
+        for session_id in session_ids:
+            session = self._find_session(session_id)
+            if session is None:
+                continue
+            created_at = getattr(session, 'created_at', None)
+            if created_at is not None and \
+                    not self._is_expired(created_at, now):
+                continue
+            expired.append(session)
+            freed += sys.getsizeof(session) + sum(
+                sys.getsizeof(getattr(session, attr, None))
+                for attr in session.fields)
+
+        with self._reaped_lock:
+            self._reaped.extend(expired)
+        return len(expired), freed
+
+    def _flush_reaped(self) -> None:
+        """Removes the sessions collected by the sweep, in one write"""
+        with self._reaped_lock:
+            expired, self._reaped = self._reaped, []
+        if not expired:
+            return
+        before = storage.generation(UserSession.__name__)
+        UserSession.remove_many(expired)
+        self._wrote(before)
+        with self._cache_lock:
+            for session in expired:
+                self._cache.pop(session.session_id, None)
+
+    def _find_session(self, session_id: str) -> Optional[UserSession]:
+        """Returns the stored UserSession for a session_id"""
+        sessions = UserSession.search({'session_id': session_id})
+        if not sessions:
+            return None
+        return sessions[0]
+
+    def _cached_session(self, session_id: str) -> Optional[Tuple]:
+        """Returns (user_id, created_at) for a session_id, from the cache
+        when possible"""
+        self._sync()
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+            if entry is not None:
+                self._cache.move_to_end(session_id)
+                CACHE_RESULTS.inc(result="hit")
+                return entry
+        CACHE_RESULTS.inc(result="miss")
+
+        session = self._find_session(session_id)
+        if session is None:
+            return None
+        entry = (session.user_id, getattr(session, 'created_at', None))
+        with self._cache_lock:
+            self._cache[session_id] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
 
     def create_session(self, user_id: str = None) -> Optional[str]:
         """Creates and saves a UserSession"""
@@ -17,8 +160,11 @@ class SessionDBAuth(SessionExpAuth):
         if session_id is None:
             return None
 
+        self._sync()
+        before = storage.generation(UserSession.__name__)
         new_session = UserSession(user_id=user_id, session_id=session_id)
         new_session.save()
+        self._wrote(before)
         return session_id
 
     def user_id_for_session_id(self, session_id: str = None) -> Optional[str]:
@@ -26,23 +172,29 @@ class SessionDBAuth(SessionExpAuth):
         if session_id is None:
             return None
 
-        UserSession.load_from_file()
-        sessions = UserSession.search({'session_id': session_id})
-        if not sessions:
+        entry = self._cached_session(session_id)
+        if entry is None:
+            self._count_lookup("missing")
             return None
 
-        session = sessions[0]
+        user_id, created_at = entry
         if self.session_duration <= 0:
-            return session.user_id
+            self._count_lookup("found")
+            return user_id
 
-        if not hasattr(session, 'created_at'):
+        if created_at is None:
+            self._count_lookup("missing")
             return None
 
-        ex_time = session.created_at + timedelta(seconds=self.session_duration)
+        ex_time = created_at + timedelta(seconds=self.session_duration)
         if ex_time < datetime.utcnow():
+            with self._cache_lock:
+                self._cache.pop(session_id, None)
+            self._count_lookup("expired")
             return None
 
-        return session.user_id
+        self._count_lookup("found")
+        return user_id
 
     def destroy_session(self, request=None) -> bool:
         """Deletes the UserSession corresponding to the request"""
@@ -53,11 +205,32 @@ class SessionDBAuth(SessionExpAuth):
         if session_id is None:
             return False
 
-        UserSession.load_from_file()
-        sessions = UserSession.search({'session_id': session_id})
-        if not sessions:
+        self._sync()
+        session = self._find_session(session_id)
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+        if session is None:
             return False
 
-        session = sessions[0]
+        before = storage.generation(UserSession.__name__)
         session.remove()
+        self._wrote(before)
+        SESSIONS_DESTROYED.inc(scheme=type(self).__name__)
         return True
+
+    def destroy_all_sessions(self, user_id: str) -> int:
+        """Deletes every UserSession of a user"""
+        if user_id is None:
+            return 0
+        super().destroy_all_sessions(user_id)
+
+        self._sync()
+        sessions = UserSession.search({'user_id': user_id})
+        if sessions:
+            before = storage.generation(UserSession.__name__)
+            UserSession.remove_many(sessions)
+            self._wrote(before)
+        with self._cache_lock:
+            for session in sessions:
+                self._cache.pop(session.session_id, None)
+        return len(sessions)
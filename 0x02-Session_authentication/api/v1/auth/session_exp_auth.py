@@ -3,12 +3,62 @@
 
 from datetime import datetime, timedelta
 from os import getenv
-from typing import Optional
+from typing import List, Optional, Tuple
 from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_reaper import SessionReaper
+from models import metrics
+import functools
+import sys
+import weakref
+
+# Reapers of every live SessionExpAuth instance, summed by the metrics
+REAPERS = weakref.WeakSet()
+
+
+def _reaper_stat(stat: str):
+    """Returns a metrics callback summing <stat> over REAPERS"""
+    return lambda: {(): sum(reaper.stats()[stat]
+                            for reaper in list(REAPERS))}
+
+
+for _stat, _kind, _help in (
+        ("sessions_reaped", "counter", "Expired sessions evicted"),
+        ("bytes_reclaimed", "counter",
+         "Approximate bytes freed by evictions"),
+        ("sweeps", "counter", "Reaper sweeps"),
+        ("errors", "counter", "Reaper sweeps that raised"),
+        ("scheduled", "gauge", "Sessions waiting to expire")):
+    metrics.gauge("session_reaper_" + _stat +
+                  ("_total" if _kind == "counter" else ""),
+                  _help, _reaper_stat(_stat), kind=_kind)
+
+
+def _starts_reaper(init):
+    """Starts the reaper when the __init__ of the instance's own class
+    returns, so the thread never sees a half-initialized scheme"""
+    @functools.wraps(init)
+    def wrapper(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        if type(self).__init__ is wrapper:
+            self.start_reaper()
+    return wrapper
 
 
 class SessionExpAuth(SessionAuth):
-    """Session authentication with expiration"""
+    """Session authentication with expiration
+
+    When sessions expire (SESSION_DURATION > 0), a SessionReaper evicts
+    expired sessions every SESSION_REAP_INTERVAL seconds (default 60,
+    0 disables the thread), SESSION_REAP_BATCH at a time. The reaper is
+    seeded and started once the instance is fully initialized, after
+    the __init__ of a subclass too.
+    """
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Defers starting the reaper to the end of a subclass __init__"""
+        super().__init_subclass__(**kwargs)
+        if "__init__" in cls.__dict__:
+            cls.__init__ = _starts_reaper(cls.__dict__["__init__"])
 
     def __init__(self) -> None:
         """Initialize with session duration from environment"""
@@ -18,36 +68,104 @@ class SessionExpAuth(SessionAuth):
         except Exception:
             self.session_duration = 0
 
-    def create_session(self, user_id: str = None) -> Optional[str]:
-        """Create a session and store creation timestamp"""
-        session_id = super().create_session(user_id)
-        if session_id is None:
-            return None
+        self.reaper = None
+        self._reaper_started = False
+        if self.session_duration > 0:
+            self.reaper = SessionReaper(
+                self._reap,
+                interval=float(getenv("SESSION_REAP_INTERVAL", "60")),
+                batch_size=int(getenv("SESSION_REAP_BATCH", "1000")),
+                flush=self._flush_reaped)
+        if type(self).__init__ is SessionExpAuth.__init__:
+            self.start_reaper()
+
+    def start_reaper(self) -> None:
+        """Schedules the existing sessions and starts the reaper thread,
+        once"""
+        if self.reaper is None or self._reaper_started:
+            return
+        self._reaper_started = True
+        self._seed_reaper()
+        self.reaper.start()
+        REAPERS.add(self.reaper)
+
+    def _seed_reaper(self) -> None:
+        """Schedules the sessions that already exist"""
+        for session_id, session_dict in self.session_store.items():
+            if isinstance(session_dict, dict) and \
+                    isinstance(session_dict.get("created_at"), datetime):
+                self._schedule(session_id, session_dict["created_at"])
+
+    def _schedule(self, session_id: str, created_at: datetime) -> None:
+        """Registers a session with the reaper (local naive created_at)"""
+        if self.reaper is not None:
+            expires = created_at + timedelta(seconds=self.session_duration)
+            self.reaper.schedule(session_id, expires.timestamp())
+
+    def _is_expired(self, created_at: datetime, now: datetime) -> bool:
+        """Tells if a session created at <created_at> is expired"""
+        return now > created_at + timedelta(seconds=self.session_duration)
+
+    def _reap(self, session_ids: List[str],
+              now: float) -> Tuple[int, int]:
+        """Removes the stored sessions among <session_ids> expired at
+        <now> (epoch seconds)"""
+        now = datetime.fromtimestamp(now)
+        removed = freed = 0
+        for session_id in session_ids:
+            session_dict = self.session_store.get(session_id)
+            if session_dict is None:
+                # Stores with native expiry hide the session already
+                if self.session_store.delete(session_id):
+                    removed += 1
+                continue
+            if not isinstance(session_dict, dict):
+                continue
+            created_at = session_dict.get("created_at")
+            if isinstance(created_at, datetime) and \
+                    not self._is_expired(created_at, now):
+                continue
+            if not self.session_store.delete(session_id):
+                continue
+            removed += 1
+            freed += sys.getsizeof(session_id) + sys.getsizeof(session_dict)
+        return removed, freed
+
+    def _flush_reaped(self) -> None:
+        """Persists the evictions of a sweep; the session store deletes
+        in _reap already"""
 
-        self.user_id_by_session_id[session_id] = {
+    def _store_session(self, session_id: str, user_id: str) -> None:
+        """Store a session with its creation timestamp"""
+        created_at = datetime.now()
+        self.session_store.set(session_id, {
             "user_id": user_id,
-            "created_at": datetime.now()
-        }
-        return session_id
+            "created_at": created_at
+        }, ttl=self.session_duration if self.session_duration > 0 else None)
+        self._schedule(session_id, created_at)
 
     def user_id_for_session_id(self, session_id: str = None) -> Optional[str]:
         """Return user_id if session is valid and not expired"""
         if session_id is None:
             return None
 
-        session_dict = self.user_id_by_session_id.get(session_id)
+        session_dict = self.session_store.get(session_id)
         if not session_dict:
+            self._count_lookup("missing")
             return None
 
         if self.session_duration <= 0:
+            self._count_lookup("found")
             return session_dict.get("user_id")
 
         created_at = session_dict.get("created_at")
         if not created_at or not isinstance(created_at, datetime):
+            self._count_lookup("missing")
             return None
 
-        time = datetime.now()
-        if time > created_at + timedelta(seconds=self.session_duration):
+        if self._is_expired(created_at, datetime.now()):
+            self._count_lookup("expired")
             return None
 
+        self._count_lookup("found")
         return session_dict.get("user_id")
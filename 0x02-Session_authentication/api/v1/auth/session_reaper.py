@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Expired session reaper"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import heapq
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SessionReaper:
+    """Evicts expired sessions in batches from a background thread
+
+    Sessions are scheduled in a min-heap ordered by expiry time, so a
+    sweep only looks at the sessions that are actually due. The evict
+    callback receives a batch of session IDs and the sweep time (epoch
+    seconds), removes those still present and expired at that time, and
+    returns (sessions removed, bytes freed). The optional flush callback
+    is called once at the end of every sweep, after the last batch, for
+    evictions that are persisted together.
+    Heap entries for sessions destroyed earlier are simply skipped by
+    the callback. A sweep that raises is logged and counted in `errors`;
+    the thread keeps running.
+    """
+
+    def __init__(self,
+                 evict: Callable[[List[str], float], Tuple[int, int]],
+                 interval: float = 60, batch_size: int = 1000,
+                 flush: Optional[Callable[[], None]] = None) -> None:
+        """Initialize the reaper; call start() to run it in a thread"""
+        self.evict = evict
+        self.flush = flush
+        self.interval = interval
+        self.batch_size = batch_size
+        self.sessions_reaped = 0
+        self.bytes_reclaimed = 0
+        self.sweeps = 0
+        self.errors = 0
+        self._heap = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def schedule(self, session_id: str, expires_at: float) -> None:
+        """Registers a session expiring at <expires_at> (epoch seconds)"""
+        with self._lock:
+            heapq.heappush(self._heap, (expires_at, session_id))
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Evicts every session expired at <now>, returns how many"""
+        if now is None:
+            now = time.time()
+        reaped = 0
+        try:
+            while True:
+                batch = []
+                with self._lock:
+                    while (self._heap and self._heap[0][0] <= now and
+                           len(batch) < self.batch_size):
+                        batch.append(heapq.heappop(self._heap)[1])
+                if not batch:
+                    break
+                removed, freed = self.evict(batch, now)
+                reaped += removed
+                with self._lock:
+                    self.sessions_reaped += removed
+                    self.bytes_reclaimed += freed
+        finally:
+            if self.flush is not None:
+                self.flush()
+        with self._lock:
+            self.sweeps += 1
+        return reaped
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the reaper counters"""
+        with self._lock:
+            return {
+                "sessions_reaped": self.sessions_reaped,
+                "bytes_reclaimed": self.bytes_reclaimed,
+                "sweeps": self.sweeps,
+                "errors": self.errors,
+                "scheduled": len(self._heap),
+            }
+
+    def _run(self) -> None:
+        """Background loop"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Session reaper sweep failed")
+                with self._lock:
+                    self.errors += 1
+
+    def start(self) -> None:
+        """Starts the background thread"""
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
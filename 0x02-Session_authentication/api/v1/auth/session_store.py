@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""Session store backends for SessionAuth
+
+SESSION_STORE selects the backend:
+  - memory (default): a dict in this process, safe to share between
+    request threads
+  - sqlite: a sqlite file shared by every worker on the host
+    (SESSION_STORE_PATH, default .db_sessions.sqlite3)
+  - redis: any Redis-protocol server (SESSION_STORE_URL, default
+    redis://localhost:6379/0), through redis-py when it is installed;
+    SESSION_STORE_TIMEOUT bounds connects and replies (default 5s)
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from os import getenv
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+import json
+import socket
+import sqlite3
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def session_user_id(value) -> Optional[str]:
+    """Returns the user ID of a session value (a user ID or a dict)"""
+    if isinstance(value, dict):
+        return value.get("user_id")
+    return value
+
+
+def encode_session(value) -> str:
+    """Serializes a session value (a user ID or a session dict)"""
+    return json.dumps(value, default=lambda dt: dt.isoformat())
+
+
+def decode_session(data: str):
+    """Deserializes a value written by encode_session"""
+    value = json.loads(data)
+    if isinstance(value, dict) and isinstance(value.get("created_at"), str):
+        value["created_at"] = datetime.fromisoformat(value["created_at"])
+    return value
+
+
+class SessionStore(ABC):
+    """Interface of a session store: session_id -> session value"""
+
+    @abstractmethod
+    def get(self, session_id: str):
+        """Returns the value of a session, None if unknown or expired"""
+
+    @abstractmethod
+    def set(self, session_id: str, value, ttl: Optional[int] = None):
+        """Stores a session, expiring after <ttl> seconds if given"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Removes a session, returns False if it didn't exist"""
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[str, object]]:
+        """Iterates over every (session_id, value)"""
+
+    @abstractmethod
+    def sessions_of(self, user_id: str) -> List[str]:
+        """Returns the session IDs of a user"""
+
+    @abstractmethod
+    def delete_user(self, user_id: str) -> int:
+        """Removes every session of a user, returns how many"""
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions in a dict of this process; expiry is left to the auth
+
+    <by_user> indexes the session IDs of <sessions> by user ID. Every
+    operation holds <lock>, so a session and its index entry change
+    together even when request threads race; stores wrapping the same
+    dicts must share the lock. stats() counts sessions, users and
+    lookups.
+    """
+
+    def __init__(self, sessions: dict = None, by_user: dict = None,
+                 lock=None):
+        """Wraps <sessions> and its index, new dicts and lock by default"""
+        self.sessions = sessions if sessions is not None else {}
+        self.by_user = by_user if by_user is not None else {}
+        self._lock = lock if lock is not None else threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _unindex(self, session_id: str, value) -> None:
+        """Drops <session_id> from the user index"""
+        user_id = session_user_id(value)
+        session_ids = self.by_user.get(user_id)
+        if session_ids is not None:
+            session_ids.discard(session_id)
+            if not session_ids:
+                self.by_user.pop(user_id, None)
+
+    def get(self, session_id: str):
+        """Returns the value of a session"""
+        with self._lock:
+            value = self.sessions.get(session_id)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, session_id: str, value, ttl: Optional[int] = None):
+        """Stores a session"""
+        with self._lock:
+            old = self.sessions.get(session_id)
+            if old is not None:
+                self._unindex(session_id, old)
+            self.sessions[session_id] = value
+            self.by_user.setdefault(session_user_id(value), set()).add(
+                session_id)
+
+    def delete(self, session_id: str) -> bool:
+        """Removes a session"""
+        with self._lock:
+            value = self.sessions.pop(session_id, None)
+            if value is None:
+                return False
+            self._unindex(session_id, value)
+            return True
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        """Iterates over a snapshot of the sessions"""
+        with self._lock:
+            return iter(list(self.sessions.items()))
+
+    def sessions_of(self, user_id: str) -> List[str]:
+        """Returns the session IDs of a user"""
+        with self._lock:
+            return list(self.by_user.get(user_id, ()))
+
+    def delete_user(self, user_id: str) -> int:
+        """Removes every session of a user"""
+        with self._lock:
+            session_ids = self.by_user.pop(user_id, ())
+            for session_id in session_ids:
+                self.sessions.pop(session_id, None)
+            return len(session_ids)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of sessions and users, and the lookups
+        that found a session or not"""
+        with self._lock:
+            return {
+                "sessions": len(self.sessions),
+                "users": len(self.by_user),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a sqlite file, shared by the processes of a host"""
+
+    def __init__(self, db_path: str = ".db_sessions.sqlite3"):
+        """Opens the database"""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sessions "
+                           "(session_id TEXT PRIMARY KEY, value TEXT, "
+                           "expires_at REAL, user_id TEXT)")
+        columns = [row[1] for row in
+                   self._conn.execute("PRAGMA table_info(sessions)")]
+        if "user_id" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN user_id TEXT")
+            for session_id, value in self._conn.execute(
+                    "SELECT session_id, value FROM sessions").fetchall():
+                self._conn.execute(
+                    "UPDATE sessions SET user_id = ? WHERE session_id = ?",
+                    (session_user_id(decode_session(value)), session_id))
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_user_id "
+                           "ON sessions (user_id)")
+
+    def get(self, session_id: str):
+        """Returns the value of a session, None if unknown or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sessions WHERE session_id = ? AND "
+                "(expires_at IS NULL OR expires_at > ?)",
+                (session_id, time.time())).fetchone()
+        return decode_session(row[0]) if row else None
+
+    def set(self, session_id: str, value, ttl: Optional[int] = None):
+        """Stores a session"""
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions "
+                "(session_id, value, expires_at, user_id) VALUES (?, ?, ?, ?)",
+                (session_id, encode_session(value), expires_at,
+                 session_user_id(value)))
+
+    def delete(self, session_id: str) -> bool:
+        """Removes a session"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        """Iterates over every stored session"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, value FROM sessions").fetchall()
+        return ((session_id, decode_session(value))
+                for session_id, value in rows)
+
+    def sessions_of(self, user_id: str) -> List[str]:
+        """Returns the session IDs of a user"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM sessions WHERE user_id = ?",
+                (user_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_user(self, user_id: str) -> int:
+        """Removes every session of a user"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE user_id = ?", (user_id,))
+        return cursor.rowcount
+
+
+class RESPError(Exception):
+    """Error reply (-ERR ...) of a Redis-protocol server"""
+
+
+class RESPClient:
+    """Minimal Redis-protocol client: GET, SET, DEL, SCAN, sets and
+    key expiry
+
+    It implements the subset of the redis-py API used by
+    RedisSessionStore, which accepts either this client, a redis.Redis
+    instance or a fake with the same methods. It is the fallback when
+    redis-py is not installed.
+
+    Connecting and every reply wait at most <timeout> seconds. A command
+    failing with an OSError (dropped connection, server restart, time
+    out) is retried once on a new connection; the commands used by
+    RedisSessionStore are idempotent.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0",
+                 timeout: Optional[float] = 5.0):
+        """Connects to the server at <url>"""
+        parsed = urlparse(url)
+        self._address = (parsed.hostname or "localhost",
+                         parsed.port or 6379)
+        self._password = parsed.password
+        self._db = (parsed.path or "/0").lstrip("/") or "0"
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+        with self._lock:
+            self._connect()
+
+    def _connect(self) -> None:
+        """Opens the connection, authenticates and selects the db"""
+        self._sock = socket.create_connection(self._address,
+                                              timeout=self.timeout)
+        self._file = self._sock.makefile("rb")
+        try:
+            if self._password:
+                self._send("AUTH", self._password)
+            if self._db != "0":
+                self._send("SELECT", self._db)
+        except BaseException:
+            self._close()
+            raise
+
+    def _close(self) -> None:
+        """Drops the connection"""
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def _send(self, *args):
+        """Sends a command on the open connection, returns its reply"""
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(parts))
+        return self._reply()
+
+    def _command(self, *args):
+        """Sends a command and returns its decoded reply, reconnecting
+        and retrying once on a connection error"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(*args)
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+
+    def _reply(self):
+        """Reads one RESP reply"""
+        line = self._file.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the server")
+        line = line[:-2]
+        kind, rest = line[:1], line[1:]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RESPError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            if int(rest) < 0:
+                return None
+            data = self._file.read(int(rest) + 2)
+            return data[:-2]
+        if kind == b"*":
+            if int(rest) < 0:
+                return None
+            return [self._reply() for _ in range(int(rest))]
+        raise ConnectionError("Unexpected reply: {!r}".format(line))
+
+    def get(self, key: str) -> Optional[bytes]:
+        """GET key"""
+        return self._command("GET", key)
+
+    def set(self, key: str, value: str, ex: Optional[int] = None):
+        """SET key value [EX seconds]"""
+        if ex:
+            return self._command("SET", key, value, "EX", ex)
+        return self._command("SET", key, value)
+
+    def delete(self, *keys: str) -> int:
+        """DEL key [key ...]"""
+        return self._command("DEL", *keys)
+
+    def expire(self, key: str, seconds: int) -> int:
+        """EXPIRE key seconds"""
+        return self._command("EXPIRE", key, seconds)
+
+    def persist(self, key: str) -> int:
+        """PERSIST key"""
+        return self._command("PERSIST", key)
+
+    def ttl(self, key: str) -> int:
+        """TTL key: seconds left, -1 without expiry, -2 if missing"""
+        return self._command("TTL", key)
+
+    def sadd(self, key: str, *members: str) -> int:
+        """SADD key member [member ...]"""
+        return self._command("SADD", key, *members)
+
+    def srem(self, key: str, *members: str) -> int:
+        """SREM key member [member ...]"""
+        return self._command("SREM", key, *members)
+
+    def smembers(self, key: str) -> set:
+        """SMEMBERS key"""
+        return set(self._command("SMEMBERS", key))
+
+    def scan_iter(self, match: str) -> Iterator[bytes]:
+        """Iterates over the keys matching <match> with SCAN"""
+        cursor = b"0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", match)
+            for key in keys:
+                yield key
+            if cursor == b"0":
+                return
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions in a Redis-protocol server, with native key expiry
+
+    The session IDs of each user are kept in a set under
+    user_prefix + user_id; members whose session expired are dropped
+    when the set is read. The set expires with the longest-lived
+    session added to it: each SADD extends its expiry to at least the
+    session TTL, and a session without TTL makes it persistent.
+    """
+
+    prefix = "session:"
+    user_prefix = "user_sessions:"
+
+    def __init__(self, client=None, url: str = None,
+                 timeout: Optional[float] = 5.0):
+        """Uses <client>, or connects to <url> with redis-py, or with a
+        RESPClient when redis-py is not installed"""
+        if client is None:
+            url = url or "redis://localhost:6379/0"
+            if redis is not None:
+                client = redis.Redis.from_url(
+                    url, socket_timeout=timeout,
+                    socket_connect_timeout=timeout)
+            else:
+                client = RESPClient(url, timeout=timeout)
+        self.client = client
+
+    def get(self, session_id: str):
+        """Returns the value of a session, None if unknown or expired"""
+        data = self.client.get(self.prefix + session_id)
+        if data is None:
+            return None
+        if isinstance(data, bytes):
+            data = data.decode()
+        return decode_session(data)
+
+    def set(self, session_id: str, value, ttl: Optional[int] = None):
+        """Stores a session"""
+        old = self.get(session_id)
+        if old is not None and session_user_id(old) != session_user_id(value):
+            self.client.srem(self.user_prefix + session_user_id(old),
+                             session_id)
+        self.client.set(self.prefix + session_id, encode_session(value),
+                        ex=ttl or None)
+        self._index(session_user_id(value), session_id, ttl)
+
+    def _index(self, user_id: str, session_id: str,
+               ttl: Optional[int]) -> None:
+        """Adds a session to the set of its user, keeping the set alive
+        for at least <ttl> seconds (forever without <ttl>)"""
+        key = self.user_prefix + user_id
+        left = self.client.ttl(key)
+        self.client.sadd(key, session_id)
+        if not ttl:
+            self.client.persist(key)
+        elif left == -2 or 0 <= left < ttl:
+            self.client.expire(key, ttl)
+
+    def delete(self, session_id: str) -> bool:
+        """Removes a session"""
+        value = self.get(session_id)
+        if value is not None:
+            self.client.srem(self.user_prefix + session_user_id(value),
+                             session_id)
+        return self.client.delete(self.prefix + session_id) > 0
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        """Iterates over every stored session"""
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            if isinstance(key, bytes):
+                key = key.decode()
+            session_id = key[len(self.prefix):]
+            value = self.get(session_id)
+            if value is not None:
+                yield session_id, value
+
+    def sessions_of(self, user_id: str) -> List[str]:
+        """Returns the session IDs of a user"""
+        key = self.user_prefix + user_id
+        session_ids = []
+        for member in self.client.smembers(key):
+            if isinstance(member, bytes):
+                member = member.decode()
+            if self.get(member) is None:
+                self.client.srem(key, member)
+            else:
+                session_ids.append(member)
+        return session_ids
+
+    def delete_user(self, user_id: str) -> int:
+        """Removes every session of a user"""
+        session_ids = self.sessions_of(user_id)
+        removed = 0
+        if session_ids:
+            removed = self.client.delete(
+                *[self.prefix + session_id for session_id in session_ids])
+        self.client.delete(self.user_prefix + user_id)
+        return removed
+
+
+def get_session_store(sessions: dict = None, by_user: dict = None,
+                      lock=None) -> SessionStore:
+    """Returns the session store selected by SESSION_STORE; the memory
+    store wraps <sessions> and its user index <by_user>, guarded by
+    <lock>"""
+    backend = getenv("SESSION_STORE", "memory")
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            getenv("SESSION_STORE_PATH", ".db_sessions.sqlite3"))
+    if backend == "redis":
+        return RedisSessionStore(
+            url=getenv("SESSION_STORE_URL"),
+            timeout=float(getenv("SESSION_STORE_TIMEOUT", "5")))
+    return MemorySessionStore(sessions, by_user, lock)
@@ -4,7 +4,6 @@
 from flask import jsonify, request, abort, make_response
 from api.v1.views import app_views
 from models.user import User
-from os import getenv
 
 
 @app_views.route('/auth_session/login', methods=['POST'], strict_slashes=False)
@@ -32,8 +31,7 @@ def session_auth_login():
     session_id = auth.create_session(user.id)
 
     response = make_response(jsonify(user.to_json()))
-    session_name = getenv("SESSION_NAME")
-    response.set_cookie(session_name, session_id)
+    response.set_cookie(auth.session_name, session_id)
     return response
 
 
@@ -57,6 +57,10 @@ def delete_user(user_id: str = None) -> str:
     if user is None:
         abort(404)
     user.remove()
+
+    from api.v1.app import auth
+    if auth is not None:
+        auth.destroy_all_sessions(user.id)
     return jsonify({}), 200
 
 
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+""" ASGI concurrency check: slow requests served side by side
+
+Adds a route sleeping DELAY seconds to the Flask app, then sends N
+concurrent requests to api.v1.asgi.application on one event loop and
+reports the wall time. With the WSGI app running in a thread pool the
+requests overlap and the total stays close to DELAY; requests
+serialized on one thread take N * DELAY.
+
+Usage: ./benchmark_asgi.py [concurrency ...]   (default: 1 4 16)
+       WSGI_WORKERS=4 ./benchmark_asgi.py 16
+"""
+import asyncio
+import sys
+import time
+
+from api.v1.app import app
+
+DELAY = 0.5
+
+
+@app.route('/api/v1/benchmark/sleep', strict_slashes=False)
+def benchmark_sleep() -> str:
+    """ GET /api/v1/benchmark/sleep: sleep DELAY seconds
+    """
+    time.sleep(DELAY)
+    return "OK"
+
+
+from api.v1.asgi import application  # noqa: E402
+
+
+async def request(path: str) -> int:
+    """ Send one GET <path> to the ASGI application, return the status
+    """
+    scope = {"type": "http", "asgi": {"version": "3.0"},
+             "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": b"", "headers": [],
+             "server": ("localhost", 5000), "client": ("127.0.0.1", 0)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]["status"]
+
+
+async def bench(concurrency: int):
+    """ Time <concurrency> simultaneous slow requests
+    """
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*[
+        request('/api/v1/benchmark/sleep') for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    print("{:>4} requests of {}s: {:6.2f}s (serialized: {:.2f}s) {}".format(
+        concurrency, DELAY, elapsed, concurrency * DELAY,
+        sorted(set(statuses))))
+
+
+if __name__ == "__main__":
+    levels = [int(arg) for arg in sys.argv[1:]] or [1, 4, 16]
+    for concurrency in levels:
+        asyncio.run(bench(concurrency))
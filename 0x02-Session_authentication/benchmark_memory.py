@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+""" Memory benchmark: bytes per resident UserSession object
+
+Compares the slots-based models with an equivalent __dict__-based class
+laid out like the models were before (two independent datetimes, a UUID
+string and the session attributes in a per-instance dict).
+
+Usage: ./benchmark_memory.py [count]
+"""
+from datetime import datetime
+import sys
+import tracemalloc
+import uuid
+
+from models.user_session import UserSession
+
+
+class DictUserSession():
+    """ __dict__-based UserSession replica, the pre-slots layout
+    """
+
+    def __init__(self, user_id: str, session_id: str):
+        """ Initialize like Base + UserSession used to
+        """
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.user_id = user_id
+        self.session_id = session_id
+
+
+def bytes_per_object(factory, count: int) -> float:
+    """ Average traced allocation of <count> objects built by <factory>
+    """
+    user_ids = [str(uuid.uuid4()) for _ in range(count)]
+    session_ids = [str(uuid.uuid4()) for _ in range(count)]
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objs = [factory(user_ids[i], session_ids[i]) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    total = sum(stat.size_diff for stat in after.compare_to(before,
+                                                            'filename'))
+    # The list holding the objects is not part of their footprint
+    total -= sys.getsizeof(objs)
+    return total / count
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    before = bytes_per_object(DictUserSession, count)
+    after = bytes_per_object(
+        lambda user_id, session_id: UserSession(user_id=user_id,
+                                                session_id=session_id),
+        count)
+
+    print("objects:           {}".format(count))
+    print("__dict__ layout:   {:.1f} bytes/object".format(before))
+    print("slots layout:      {:.1f} bytes/object".format(after))
+    print("saved:             {:.1f}%".format(100 * (1 - after / before)))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+""" Session store benchmark: concurrent create / lookup / destroy
+
+Each thread runs a request mix (one create, eight lookups, one destroy
+per cycle, every session of the same user) against a MemorySessionStore,
+with its lock and without it (the cost of the lock), and reports total
+operations per second for each thread count. After each run the user
+index is checked against the sessions left in the store.
+
+Usage: ./benchmark_sessions.py [threads ...]   (default: 1 2 4 8)
+"""
+from contextlib import nullcontext
+import sys
+import threading
+import time
+import uuid
+
+from api.v1.auth.session_store import MemorySessionStore
+
+CYCLES = 20000
+LOOKUPS = 8
+
+
+def worker(store: MemorySessionStore, session_ids: list,
+           barrier: threading.Barrier):
+    """ Run the request mix over <session_ids>
+    """
+    barrier.wait()
+    for session_id in session_ids:
+        store.set(session_id, "user")
+        for _ in range(LOOKUPS):
+            store.get(session_id)
+        store.delete(session_id)
+
+
+def consistent(store: MemorySessionStore) -> bool:
+    """ True if the user index lists exactly the stored sessions
+    """
+    indexed = set()
+    for session_ids in store.by_user.values():
+        indexed.update(session_ids)
+    return indexed == set(store.sessions) and \
+        all(store.by_user.values())
+
+
+def run(store: MemorySessionStore, threads: int):
+    """ Return (ops/sec, consistent) for <threads> threads sharing <store>
+    """
+    ids = [[str(uuid.uuid4()) for _ in range(CYCLES)]
+           for _ in range(threads)]
+    # Sessions that stay while the workers run, as logged-in users do
+    for session_id in ids[0][:100]:
+        store.set(session_id + "-kept", "kept")
+    barrier = threading.Barrier(threads + 1)
+    pool = [threading.Thread(target=worker, args=(store, ids[i], barrier))
+            for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    ops = threads * CYCLES * (LOOKUPS + 2) / elapsed
+    return ops, consistent(store) and len(store.sessions) == 100
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 2, 4, 8]
+
+    print("{:>8} {:>22} {:>22}".format("threads", "lock", "no lock"))
+    for threads in counts:
+        locked, locked_ok = run(MemorySessionStore(), threads)
+        unlocked, unlocked_ok = run(
+            MemorySessionStore(lock=nullcontext()), threads)
+        print("{:>8} {:>12.0f} op/s {:>5} {:>12.0f} op/s {:>5}".format(
+            threads, locked, "ok" if locked_ok else "BAD",
+            unlocked, "ok" if unlocked_ok else "BAD"))
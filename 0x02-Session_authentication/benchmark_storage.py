@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+""" Snapshot benchmark: User.save_to_file / User.load_from_file
+
+Builds N users in memory, then times writing and reading the snapshot
+with the current storage engine and JSON backend (BASE_STORAGE,
+BASE_JSON_BACKEND), and compares the timestamp codec with strptime /
+strftime. Runs in a temporary directory.
+
+Usage: ./benchmark_storage.py [count ...]   (default: 1000 10000 100000)
+       BASE_JSON_BACKEND=json ./benchmark_storage.py 1000000
+"""
+from datetime import datetime
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+from models import base
+from models.engine import serializer
+from models.user import User
+
+
+def timed(func) -> float:
+    """ Wall time of one call of <func>, in seconds
+    """
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench_snapshot(count: int):
+    """ Time one snapshot write and one snapshot read of <count> users
+    """
+    if os.path.exists(".db_User.json"):
+        os.remove(".db_User.json")
+    User.load_from_file()
+    for i in range(count):
+        user = User(email="user{}@hbtn.io".format(i), first_name="Bob")
+        base.DATA["User"][user.id] = user
+
+    write = timed(User.save_to_file)
+    size = os.path.getsize(".db_User.json")
+    read = timed(User.load_from_file)
+    assert User.count() == count
+
+    print("{:>9} users  save {:8.3f}s  load {:8.3f}s  {:8.1f} MB".format(
+        count, write, read, size / 1e6))
+
+
+def bench_codec():
+    """ Compare the timestamp codec with strptime / strftime
+    """
+    text = "2025-05-30T01:05:52"
+    value = datetime(2025, 5, 30, 1, 5, 52)
+    n = 100000
+    rows = [
+        ("strptime", lambda: datetime.strptime(text, base.TIMESTAMP_FORMAT)),
+        ("parse_timestamp", lambda: base.parse_timestamp(text)),
+        ("strftime", lambda: value.strftime(base.TIMESTAMP_FORMAT)),
+        ("format_timestamp", lambda: base.format_timestamp(value)),
+    ]
+    for name, func in rows:
+        per_call = timeit.timeit(func, number=n) / n * 1e9
+        print("{:>18} {:8.0f} ns/call".format(name, per_call))
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+
+    print("json backend: {}".format(serializer.BACKEND))
+    bench_codec()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for count in counts:
+            bench_snapshot(count)
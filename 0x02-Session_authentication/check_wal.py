@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+""" WAL recovery check: torn last record and corrupt middle record
+
+Writes User records through WALStorage in a temporary directory, then:
+  - appends half a record, as a crash during a write leaves it: load
+    skips it and keeps the log intact, and the next append cuts it off
+    so that the new record follows the last complete one;
+  - corrupts a record between good ones: load and the next append
+    raise a ValueError and the log is left untouched.
+Exits with an AssertionError on the first failed step.
+
+Usage: ./check_wal.py
+"""
+import os
+import tempfile
+
+from models.engine.wal_storage import WALStorage
+from models.user import User
+
+
+def emails(storage: WALStorage) -> list:
+    """ Sorted emails of the users stored in <storage>
+    """
+    return sorted(obj["email"] for obj in storage.load("User").values())
+
+
+def write_users(storage: WALStorage, *names: str):
+    """ Append one save record per name
+    """
+    for name in names:
+        storage.save("User", {}, User(email=name))
+    storage.flush()
+
+
+def check_torn_tail():
+    """ A torn last record is skipped by readers, cut by the writer
+    """
+    write_users(WALStorage(), "a", "b")
+    log_path = WALStorage().log_path("User")
+    with open(log_path, 'ab') as f:
+        f.write(b'{"op": "save", "id": "torn", "ob')
+    size = os.path.getsize(log_path)
+
+    assert emails(WALStorage()) == ["a", "b"]
+    assert os.path.getsize(log_path) == size, "load changed the log"
+
+    write_users(WALStorage(), "c")
+    assert emails(WALStorage()) == ["a", "b", "c"]
+    with open(log_path, 'rb') as f:
+        assert b"torn" not in f.read(), "torn record left in the log"
+    print("torn tail: OK")
+
+
+def check_corrupt_middle():
+    """ A corrupt record followed by good ones raises and keeps the log
+    """
+    storage = WALStorage()
+    log_path = storage.log_path("User")
+    write_users(storage, "a", "b", "c")
+    with open(log_path, 'rb') as f:
+        lines = f.readlines()
+    lines[1] = b'{"op": "save", "id": \n'
+    before = b"".join(lines)
+    with open(log_path, 'wb') as f:
+        f.write(before)
+
+    try:
+        WALStorage().load("User")
+    except ValueError as e:
+        print("corrupt middle: {}".format(e))
+    else:
+        raise AssertionError("load accepted a corrupt record")
+    try:
+        write_users(WALStorage(), "d")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("append after a corrupt record")
+    with open(log_path, 'rb') as f:
+        assert f.read() == before, "load changed the log"
+    print("corrupt middle: OK")
+
+
+if __name__ == "__main__":
+    for check in (check_torn_tail, check_corrupt_middle):
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            check()
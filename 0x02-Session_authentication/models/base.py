@@ -3,18 +3,68 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
-import json
+from models.engine import get_storage
+from models import metrics
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string
+
+    datetime.fromisoformat reads this fixed ISO 8601 layout much faster
+    than strptime; anything it rejects goes through strptime.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def format_timestamp(value: datetime) -> str:
+    """ Format a naive datetime as TIMESTAMP_FORMAT
+    """
+    if value.tzinfo is not None:
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value.isoformat(timespec='seconds')
+
+
 DATA = {}
+INDEXES = {}
+INDEXED_KEYS = {}
+FULLY_LOADED = set()
+storage = get_storage()
+
+STORAGE_SECONDS = metrics.histogram(
+    "storage_operation_seconds",
+    "Time spent in the storage engine, per model and operation")
+SEARCHES = metrics.counter(
+    "model_searches_total", "Base.search calls, per model and lookup path")
 
 
 class Base():
     """ Base class
+
+    Subclasses list attribute names in `indexes` to get an equality index
+    on them: {attribute: {value: {id: object}}} in INDEXES, kept in sync
+    by save, remove and load_from_file and used by search. Indexes
+    reflect saved state: change an indexed attribute, then save.
+
+    Models declare their attributes in __slots__ so that instances carry
+    no per-object __dict__; `fields` lists every slot, base class first,
+    and drives to_json.
     """
+    __slots__ = ('id', 'created_at', 'updated_at')
+    fields = __slots__
+    indexes = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """ Collect the slots of a new model class into `fields`
+        """
+        super().__init_subclass__(**kwargs)
+        cls.fields = cls.fields + tuple(cls.__dict__.get('__slots__', ()))
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
@@ -22,16 +72,21 @@ class Base():
         s_class = str(self.__class__.__name__)
         if DATA.get(s_class) is None:
             DATA[s_class] = {}
+            INDEXES[s_class] = {attr: {} for attr in self.indexes}
+            storage.register(s_class, self.indexes)
 
-        self.id = kwargs.get('id', str(uuid.uuid4()))
-        if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+        self.id = kwargs['id'] if 'id' in kwargs else str(uuid.uuid4())
+        created_at = kwargs.get('created_at')
+        updated_at = kwargs.get('updated_at')
+        if created_at is not None:
+            self.created_at = parse_timestamp(created_at)
         else:
             self.created_at = datetime.utcnow()
-        if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+        # Share one datetime object when both timestamps are equal
+        if updated_at == created_at:
+            self.updated_at = self.created_at
+        elif updated_at is not None:
+            self.updated_at = parse_timestamp(updated_at)
         else:
             self.updated_at = datetime.utcnow()
 
@@ -48,11 +103,14 @@ class Base():
         """ Convert the object a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        items = [(key, getattr(self, key)) for key in self.fields
+                 if hasattr(self, key)]
+        items.extend(getattr(self, '__dict__', {}).items())
+        for key, value in items:
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
+                result[key] = format_timestamp(value)
             else:
                 result[key] = value
         return result
@@ -60,30 +118,97 @@ class Base():
     @classmethod
     def load_from_file(cls):
         """ Load all objects from file
+
+        With a lazy storage engine nothing is read here: the cached
+        objects are only dropped if another process changed the class,
+        and get/search fetch objects on demand.
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
+        if storage.lazy:
+            storage.register(s_class, cls.indexes)
+            if storage.refresh(s_class) or s_class not in DATA:
+                cls._reset()
             return
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
+        with STORAGE_SECONDS.time(model=s_class, op="load"):
+            cls._reset()
+            objs_json = storage.load(s_class)
             for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+                obj = cls(**obj_json)
+                DATA[s_class][obj_id] = obj
+                cls._index(obj)
+
+    @classmethod
+    def _reset(cls):
+        """ Empty the in-memory objects and indexes of the class
+        """
+        s_class = cls.__name__
+        DATA[s_class] = {}
+        INDEXES[s_class] = {attr: {} for attr in cls.indexes}
+        INDEXED_KEYS[s_class] = {}
+        FULLY_LOADED.discard(s_class)
+
+    @classmethod
+    def _cache(cls, obj_json: dict) -> TypeVar('Base'):
+        """ Return the cached object of a serialized object fetched by a
+        lazy storage engine, caching it first if needed
+        """
+        s_class = cls.__name__
+        obj = DATA[s_class].get(obj_json['id'])
+        if obj is None:
+            obj = cls(**obj_json)
+            DATA[s_class][obj.id] = obj
+            cls._index(obj)
+        return obj
+
+    @classmethod
+    def _index(cls, obj: TypeVar('Base')):
+        """ Add an object to the class indexes, replacing the entries of
+        its previous save
+        """
+        cls._unindex(obj)
+        s_class = cls.__name__
+        keys = {}
+        for attr, index in INDEXES[s_class].items():
+            value = getattr(obj, attr, None)
+            index.setdefault(value, {})[obj.id] = obj
+            keys[attr] = value
+        INDEXED_KEYS.setdefault(s_class, {})[obj.id] = keys
+
+    @classmethod
+    def _unindex(cls, obj: TypeVar('Base')):
+        """ Remove an object from the class indexes
+        """
+        s_class = cls.__name__
+        keys = INDEXED_KEYS.get(s_class, {}).pop(obj.id, None)
+        if keys is None:
+            return
+        for attr, value in keys.items():
+            bucket = INDEXES[s_class][attr].get(value)
+            if bucket is not None and bucket.pop(obj.id, None) is not None:
+                if not bucket:
+                    del INDEXES[s_class][attr][value]
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
+
+        A lazy storage engine writes every save and remove as it
+        happens; until the class is fully loaded DATA only caches part
+        of it, so there is nothing to write and dumping it would drop
+        the rows that aren't cached.
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        if storage.lazy and s_class not in FULLY_LOADED:
+            return
+        with STORAGE_SECONDS.time(model=s_class, op="dump"):
+            storage.dump(s_class, DATA[s_class])
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    @classmethod
+    def flush(cls):
+        """ Persist every change still buffered by the storage engine
+        """
+        storage.flush()
 
     def save(self):
         """ Save current object
@@ -91,7 +216,9 @@ class Base():
         s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
         DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        self.__class__._index(self)
+        with STORAGE_SECONDS.time(model=s_class, op="save"):
+            storage.save(s_class, DATA[s_class], self)
 
     def remove(self):
         """ Remove object
@@ -99,13 +226,34 @@ class Base():
         s_class = self.__class__.__name__
         if DATA[s_class].get(self.id) is not None:
             del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+            self.__class__._unindex(self)
+        elif not storage.lazy:
+            return
+        with STORAGE_SECONDS.time(model=s_class, op="remove"):
+            storage.remove(s_class, DATA[s_class], self)
+
+    @classmethod
+    def remove_many(cls, objs: List[TypeVar('Base')]):
+        """ Remove several objects, persisting the removal once
+        """
+        s_class = cls.__name__
+        removed = []
+        for obj in objs:
+            if DATA[s_class].pop(obj.id, None) is not None or storage.lazy:
+                cls._unindex(obj)
+                removed.append(obj)
+        if removed:
+            with STORAGE_SECONDS.time(model=s_class, op="remove"):
+                storage.remove_many(s_class, DATA[s_class], removed)
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
         s_class = cls.__name__
+        if storage.lazy and s_class not in FULLY_LOADED:
+            cls.load_from_file()
+            return storage.count(s_class)
         return len(DATA[s_class].keys())
 
     @classmethod
@@ -119,6 +267,15 @@ class Base():
         """ Return one object by ID
         """
         s_class = cls.__name__
+        if storage.lazy:
+            cls.load_from_file()
+            obj = DATA[s_class].get(id)
+            if obj is None and s_class not in FULLY_LOADED:
+                with STORAGE_SECONDS.time(model=s_class, op="fetch"):
+                    obj_json = storage.fetch(s_class, id)
+                if obj_json is not None:
+                    obj = cls._cache(obj_json)
+            return obj
         return DATA[s_class].get(id)
 
     @classmethod
@@ -135,4 +292,43 @@ class Base():
                     return False
             return True
 
-        return list(filter(_search, DATA[s_class].values()))
+        if storage.lazy:
+            cls.load_from_file()
+            if s_class not in FULLY_LOADED:
+                SEARCHES.inc(model=s_class, path="fetch")
+                return list(filter(_search, cls._fetch(attributes)))
+
+        candidates = DATA[s_class].values()
+        path = "scan"
+        for k, v in attributes.items():
+            index = INDEXES[s_class].get(k)
+            if index is None:
+                continue
+            try:
+                candidates = index.get(v, {}).values()
+            except TypeError:
+                continue
+            path = "index"
+            break
+
+        SEARCHES.inc(model=s_class, path=path)
+        return list(filter(_search, candidates))
+
+    @classmethod
+    def _fetch(cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Fetch search candidates from a lazy storage engine: only the
+        matching rows for an indexed attribute, else every row
+        """
+        s_class = cls.__name__
+        for k, v in attributes.items():
+            if k in cls.indexes:
+                with STORAGE_SECONDS.time(model=s_class, op="fetch"):
+                    objs_json = storage.fetch_by(s_class, k, v)
+                return [cls._cache(obj_json) for obj_json in objs_json]
+
+        with STORAGE_SECONDS.time(model=s_class, op="load"):
+            objs_json = storage.load(s_class).values()
+        for obj_json in objs_json:
+            cls._cache(obj_json)
+        FULLY_LOADED.add(s_class)
+        return list(DATA[s_class].values())
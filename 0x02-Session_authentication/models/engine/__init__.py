@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+""" Storage engines used by models.base.Base
+"""
+from os import getenv
+
+
+def get_storage():
+    """ Return the storage engine selected by BASE_STORAGE
+    (file by default, wal, deferred or sqlite)
+    """
+    mode = getenv("BASE_STORAGE", "file")
+    if mode == "wal":
+        from models.engine.wal_storage import WALStorage
+        return WALStorage()
+    if mode == "deferred":
+        from models.engine.deferred_storage import DeferredStorage
+        return DeferredStorage()
+    if mode == "sqlite":
+        from models.engine.sqlite_storage import SQLiteStorage
+        return SQLiteStorage()
+    from models.engine.file_storage import FileStorage
+    return FileStorage()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+""" DeferredStorage module: write-behind snapshots
+"""
+from models.engine.file_storage import FileStorage
+from os import getenv
+import atexit
+import threading
+
+
+class DeferredStorage(FileStorage):
+    """ Persist snapshots in the background instead of on every change
+
+    save and remove only mark the class dirty. A flusher thread writes
+    the snapshot of every dirty class each BASE_FLUSH_INTERVAL seconds,
+    and is woken up early once a class has BASE_FLUSH_WRITES pending
+    changes. At most that interval, or about that many changes, can be
+    lost on a crash. Base.flush() and interpreter exit write everything
+    still pending.
+
+    save and remove never serialize or write a snapshot themselves.
+    Snapshots are written outside the lock guarding the dirty set, and
+    a per-class write lock keeps snapshots of a class in order.
+    """
+
+    def __init__(self):
+        """ Initialize the engine and start the flusher thread
+        """
+        self.flush_interval = float(getenv("BASE_FLUSH_INTERVAL", "1"))
+        self.flush_writes = int(getenv("BASE_FLUSH_WRITES", "1000"))
+        self._dirty = {}
+        self._writes = {}
+        self._lock = threading.Lock()
+        self._write_locks = {}
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._flusher = threading.Thread(target=self._run, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        """ Flusher thread loop
+        """
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _mark(self, s_class: str, objs: dict):
+        """ Mark a class dirty and wake the flusher thread if enough
+        writes piled up
+        """
+        with self._lock:
+            self._dirty[s_class] = objs
+            self._writes[s_class] = self._writes.get(s_class, 0) + 1
+            due = self._writes[s_class] >= self.flush_writes
+        if due:
+            self._wake.set()
+
+    def save(self, s_class: str, objs: dict, obj):
+        """ Mark the class of <obj> dirty
+        """
+        self._mark(s_class, objs)
+
+    def remove(self, s_class: str, objs: dict, obj):
+        """ Mark the class of <obj> dirty
+        """
+        self._mark(s_class, objs)
+
+    def remove_many(self, s_class: str, objs: dict, removed: list):
+        """ Mark the class dirty once
+        """
+        self._mark(s_class, objs)
+
+    def load(self, s_class: str) -> dict:
+        """ Write pending changes of a class, then read its snapshot
+        """
+        self.flush_class(s_class)
+        return super().load(s_class)
+
+    def flush_class(self, s_class: str):
+        """ Write the snapshot of one class if it is dirty
+        """
+        with self._lock:
+            write_lock = self._write_locks.setdefault(s_class,
+                                                      threading.Lock())
+        with write_lock:
+            with self._lock:
+                objs = self._dirty.pop(s_class, None)
+                self._writes.pop(s_class, None)
+                if objs is not None:
+                    objs = dict(objs)
+            if objs is not None:
+                self.dump(s_class, objs)
+
+    def flush(self):
+        """ Write the snapshot of every dirty class
+        """
+        with self._lock:
+            pending = list(self._dirty)
+        for s_class in pending:
+            self.flush_class(s_class)
+
+    def close(self):
+        """ Stop the flusher thread and write everything pending
+        """
+        self._stop.set()
+        self._wake.set()
+        self.flush()
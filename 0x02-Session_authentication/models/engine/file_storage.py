@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+""" FileStorage module: one JSON snapshot file per class
+"""
+from models.engine import serializer
+from os import path
+import os
+import tempfile
+
+
+class FileStorage():
+    """ Persist every object of a class to .db_<Class>.json
+
+    Every change rewrites the whole file, through a temporary file and a
+    rename so that a crash never leaves a truncated snapshot behind.
+    """
+    lazy = False
+
+    def file_path(self, s_class: str) -> str:
+        """ Path of the snapshot file of a class
+        """
+        return ".db_{}.json".format(s_class)
+
+    def register(self, s_class: str, indexes: tuple):
+        """ Nothing to prepare per class
+        """
+        pass
+
+    def generation(self, s_class: str):
+        """ Token that changes whenever the stored class changes, also
+        when another process wrote it
+        """
+        try:
+            st = os.stat(self.file_path(s_class))
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def load(self, s_class: str) -> dict:
+        """ Return {id: serialized object} read from the snapshot
+        """
+        file_path = self.file_path(s_class)
+        if not path.exists(file_path):
+            return {}
+        with open(file_path, 'rb') as f:
+            return serializer.loads(f.read())
+
+    def dump(self, s_class: str, objs: dict):
+        """ Write a snapshot of all objects {id: object} of a class
+        """
+        objs_json = {}
+        for obj_id, obj in objs.items():
+            objs_json[obj_id] = obj.to_json(True)
+
+        file_path = self.file_path(s_class)
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=".{}.".format(path.basename(file_path)),
+            dir=path.dirname(path.abspath(file_path)))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(serializer.dumps(objs_json))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def save(self, s_class: str, objs: dict, obj):
+        """ Persist <obj>, which was just stored in <objs>
+        """
+        self.dump(s_class, objs)
+
+    def remove(self, s_class: str, objs: dict, obj):
+        """ Persist the removal of <obj>, already deleted from <objs>
+        """
+        self.dump(s_class, objs)
+
+    def remove_many(self, s_class: str, objs: dict, removed: list):
+        """ Persist the removal of several objects at once
+        """
+        self.dump(s_class, objs)
+
+    def flush(self):
+        """ Nothing is buffered
+        """
+        pass
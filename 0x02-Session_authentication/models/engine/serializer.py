@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+""" JSON serializer used by the storage engines
+
+BASE_JSON_BACKEND picks the backend: orjson when installed (the default,
+"auto"), or the standard library json module ("json").
+"""
+from os import getenv
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+BACKEND = getenv("BASE_JSON_BACKEND", "auto")
+if BACKEND == "auto":
+    BACKEND = "orjson" if orjson is not None else "json"
+elif BACKEND == "orjson" and orjson is None:
+    raise ImportError("BASE_JSON_BACKEND=orjson requires orjson: "
+                      "pip install orjson")
+elif BACKEND not in ("orjson", "json"):
+    raise ValueError("Unknown BASE_JSON_BACKEND: {}".format(BACKEND))
+
+
+def dumps(obj) -> bytes:
+    """ Serialize <obj> to UTF-8 encoded JSON
+    """
+    if BACKEND == "orjson":
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def loads(data: bytes):
+    """ Deserialize UTF-8 encoded JSON
+    """
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
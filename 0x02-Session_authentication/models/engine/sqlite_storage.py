@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+""" SQLiteStorage module: on-demand object loading from a sqlite file
+"""
+from models.engine.file_storage import FileStorage
+from models.engine import serializer
+from os import getenv
+from typing import List, Optional
+import sqlite3
+import threading
+
+
+class SQLiteStorage(FileStorage):
+    """ Keep every object as a JSON row of a per-class table
+
+    The engine is lazy: Base.get and indexed Base.search read only the
+    rows they need (indexed attributes get a sqlite expression index)
+    and cache the objects in DATA. Each write bumps a per-class
+    generation counter in the same transaction; Base drops its cache of
+    a class when that counter was moved by another process, instead of
+    reloading the whole class. The file is BASE_SQLITE_PATH
+    (.db.sqlite3 by default).
+    """
+    lazy = True
+
+    def __init__(self):
+        """ Open the database
+        """
+        self.db_path = getenv("BASE_SQLITE_PATH", ".db.sqlite3")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS generations "
+                           "(class TEXT PRIMARY KEY, gen INTEGER)")
+        self._tables = set()
+        self._indexes = {}
+        self._seen = {}
+        self._stale = set()
+
+    def register(self, s_class: str, indexes: tuple):
+        """ Create the table of a class and its attribute indexes
+        """
+        if s_class in self._tables:
+            return
+        with self._lock:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS "{}" '
+                               '(id TEXT PRIMARY KEY, data TEXT)'
+                               .format(s_class))
+            for attr in indexes:
+                self._conn.execute(
+                    'CREATE INDEX IF NOT EXISTS "ix_{0}_{1}" ON "{0}" '
+                    '(json_extract(data, \'$.{1}\'))'.format(s_class, attr))
+            self._indexes[s_class] = frozenset(indexes)
+            self._tables.add(s_class)
+
+    def generation(self, s_class: str) -> int:
+        """ Current generation counter of a class
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT gen FROM generations "
+                                     "WHERE class = ?",
+                                     (s_class,)).fetchone()
+        return row[0] if row else 0
+
+    def refresh(self, s_class: str) -> bool:
+        """ Return True if the class changed since the last refresh in
+        a way this process didn't make itself
+        """
+        with self._lock:
+            current = self.generation(s_class)
+            changed = (self._seen.get(s_class) != current or
+                       s_class in self._stale)
+            self._seen[s_class] = current
+            self._stale.discard(s_class)
+            return changed
+
+    def _write(self, s_class: str, *statements):
+        """ Run (sql, rows) statements and bump the class generation in
+        one transaction
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.generation(s_class)
+                seen = self._seen.get(s_class)
+                if seen is not None and seen != before:
+                    self._stale.add(s_class)
+                for sql, rows in statements:
+                    self._conn.executemany(sql, rows)
+                self._conn.execute(
+                    "INSERT INTO generations (class, gen) VALUES (?, 1) "
+                    "ON CONFLICT(class) DO UPDATE SET gen = gen + 1",
+                    (s_class,))
+                self._seen[s_class] = before + 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def fetch(self, s_class: str, obj_id: str) -> Optional[dict]:
+        """ Return the serialized object with <obj_id>, None if missing
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM "{}" WHERE id = ?'.format(s_class),
+                (obj_id,)).fetchone()
+        return serializer.loads(row[0]) if row else None
+
+    def fetch_by(self, s_class: str, attr: str, value) -> List[dict]:
+        """ Return the serialized objects whose <attr> is <value>
+
+        <attr> must be one of the indexes registered for the class: the
+        JSON path is written into the SQL, as sqlite only matches an
+        expression index against the same literal expression.
+        """
+        if attr not in self._indexes.get(s_class, ()):
+            raise ValueError("{} has no index on {}".format(s_class, attr))
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT data FROM "{}" WHERE json_extract(data, \'$.{}\') '
+                'IS ?'.format(s_class, attr), (value,)).fetchall()
+        return [serializer.loads(row[0]) for row in rows]
+
+    def load(self, s_class: str) -> dict:
+        """ Return {id: serialized object} of every row of a class
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, data FROM "{}"'.format(s_class)).fetchall()
+        return {obj_id: serializer.loads(data) for obj_id, data in rows}
+
+    def count(self, s_class: str) -> int:
+        """ Number of stored objects of a class
+        """
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM "{}"'.format(s_class)).fetchone()[0]
+
+    def dump(self, s_class: str, objs: dict):
+        """ Replace every row of a class with <objs>, which must hold
+        every object of the class, not just the cached ones
+        """
+        rows = [(obj_id, serializer.dumps(obj.to_json(True)).decode())
+                for obj_id, obj in objs.items()]
+        self._write(s_class,
+                    ('DELETE FROM "{}"'.format(s_class), [()]),
+                    ('INSERT INTO "{}" (id, data) VALUES (?, ?)'
+                     .format(s_class), rows))
+
+    def save(self, s_class: str, objs: dict, obj):
+        """ Insert or replace the row of <obj>
+        """
+        data = serializer.dumps(obj.to_json(True)).decode()
+        self._write(s_class, ('INSERT OR REPLACE INTO "{}" (id, data) '
+                              'VALUES (?, ?)'.format(s_class),
+                              [(obj.id, data)]))
+
+    def remove(self, s_class: str, objs: dict, obj):
+        """ Delete the row of <obj>
+        """
+        self._write(s_class, ('DELETE FROM "{}" WHERE id = ?'
+                              .format(s_class), [(obj.id,)]))
+
+    def remove_many(self, s_class: str, objs: dict, removed: list):
+        """ Delete the rows of several objects in one transaction
+        """
+        self._write(s_class, ('DELETE FROM "{}" WHERE id = ?'
+                              .format(s_class),
+                              [(obj.id,) for obj in removed]))
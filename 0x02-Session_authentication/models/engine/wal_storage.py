@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+""" WALStorage module: snapshot plus append-only change log per class
+"""
+from models.engine import serializer
+from models.engine.file_storage import FileStorage
+from os import getenv, path
+import atexit
+import os
+import threading
+import time
+
+
+class WALStorage(FileStorage):
+    """ Persist changes as records appended to .db_<Class>.log
+
+    Each save or remove appends one JSON line instead of rewriting the
+    snapshot. The log is fsynced every WAL_FSYNC_BATCH records, at most
+    WAL_FSYNC_INTERVAL seconds after a record is appended (a timer
+    covers idle periods), and at exit. Once it holds
+    WAL_COMPACT_THRESHOLD records it is folded into the .db_<Class>.json
+    snapshot and truncated. Loading replays the log on top of the
+    snapshot. A last line that doesn't parse is a record torn by a
+    crash, or one still being written by the writer: readers skip it,
+    and the writer cuts it off when it opens the log, so that new
+    records follow the last complete one. A bad line with records after
+    it is corruption and raises a ValueError.
+    A single writer process per data directory is assumed.
+    """
+
+    def __init__(self):
+        """ Initialize the engine from the environment
+        """
+        self.fsync_batch = int(getenv("WAL_FSYNC_BATCH", "32"))
+        self.fsync_interval = float(getenv("WAL_FSYNC_INTERVAL", "0.05"))
+        self.compact_threshold = int(getenv("WAL_COMPACT_THRESHOLD",
+                                            "10000"))
+        self._logs = {}
+        self._records = {}
+        self._unsynced = {}
+        self._last_sync = {}
+        self._timers = {}
+        self._lock = threading.RLock()
+        atexit.register(self.flush)
+
+    def log_path(self, s_class: str) -> str:
+        """ Path of the change log of a class
+        """
+        return ".db_{}.log".format(s_class)
+
+    def generation(self, s_class: str):
+        """ Token that changes whenever the snapshot or the log changes
+        """
+        with self._lock:
+            log = self._logs.get(s_class)
+            if log is not None:
+                log.flush()
+        try:
+            st = os.stat(self.log_path(s_class))
+            log_token = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            log_token = None
+        return (super().generation(s_class), log_token)
+
+    def _read_log(self, s_class: str):
+        """ Return (records, offset) of the log of a class: the complete
+        records, and the offset following the last of them
+        """
+        records = []
+        good = 0
+        log_path = self.log_path(s_class)
+        if not path.exists(log_path):
+            return records, good
+        with open(log_path, 'rb') as f:
+            lines = f.readlines()
+        for i, line in enumerate(lines):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("torn record")
+                record = serializer.loads(line)
+            except ValueError:
+                if i == len(lines) - 1:
+                    break
+                raise ValueError("Corrupt record at byte {} of {}"
+                                 .format(good, log_path))
+            records.append(record)
+            good += len(line)
+        return records, good
+
+    def load(self, s_class: str) -> dict:
+        """ Return {id: serialized object} from the snapshot and the log
+        """
+        objs_json = super().load(s_class)
+        with self._lock:
+            if s_class in self._logs:
+                self._logs[s_class].flush()
+            records, _ = self._read_log(s_class)
+            for record in records:
+                if record["op"] == "save":
+                    objs_json[record["id"]] = record["obj"]
+                else:
+                    objs_json.pop(record["id"], None)
+            self._records[s_class] = len(records)
+        return objs_json
+
+    def _open_log(self, s_class: str):
+        """ Open the log of a class for appending, cutting off a torn
+        last record first
+        """
+        log_path = self.log_path(s_class)
+        _, good = self._read_log(s_class)
+        log = open(log_path, 'ab')
+        if log.tell() > good:
+            log.truncate(good)
+            log.flush()
+            os.fsync(log.fileno())
+        return log
+
+    def _append(self, s_class: str, objs: dict, record: dict):
+        """ Append a change record, then fsync or compact when due
+        """
+        data = serializer.dumps(record) + b"\n"
+        with self._lock:
+            log = self._logs.get(s_class)
+            if log is None:
+                log = self._open_log(s_class)
+                self._logs[s_class] = log
+                self._last_sync[s_class] = time.monotonic()
+            log.write(data)
+
+            self._records[s_class] = self._records.get(s_class, 0) + 1
+            self._unsynced[s_class] = self._unsynced.get(s_class, 0) + 1
+            if self._records[s_class] >= self.compact_threshold:
+                self.dump(s_class, objs)
+            elif (self._unsynced[s_class] >= self.fsync_batch or
+                  time.monotonic() - self._last_sync[s_class] >=
+                  self.fsync_interval):
+                self._sync(s_class)
+            elif s_class not in self._timers:
+                timer = threading.Timer(self.fsync_interval,
+                                        self._timed_sync, (s_class,))
+                timer.daemon = True
+                self._timers[s_class] = timer
+                timer.start()
+
+    def _timed_sync(self, s_class: str):
+        """ Timer callback: fsync records appended since the last fsync
+        """
+        with self._lock:
+            self._timers.pop(s_class, None)
+            if self._unsynced.get(s_class):
+                self._sync(s_class)
+
+    def _sync(self, s_class: str):
+        """ Flush and fsync the log of a class
+        """
+        with self._lock:
+            log = self._logs.get(s_class)
+            if log is None:
+                return
+            log.flush()
+            os.fsync(log.fileno())
+            self._unsynced[s_class] = 0
+            self._last_sync[s_class] = time.monotonic()
+
+    def dump(self, s_class: str, objs: dict):
+        """ Write a snapshot of all objects and start an empty log, which
+        folds (compacts) every logged change into the snapshot
+        """
+        with self._lock:
+            super().dump(s_class, objs)
+            log = self._logs.pop(s_class, None)
+            if log is not None:
+                log.close()
+            with open(self.log_path(s_class), 'wb'):
+                pass
+            self._records[s_class] = 0
+            self._unsynced[s_class] = 0
+
+    def save(self, s_class: str, objs: dict, obj):
+        """ Append a save record for <obj>
+        """
+        self._append(s_class, objs,
+                     {"op": "save", "id": obj.id, "obj": obj.to_json(True)})
+
+    def remove(self, s_class: str, objs: dict, obj):
+        """ Append a remove record for <obj>
+        """
+        self._append(s_class, objs, {"op": "remove", "id": obj.id})
+
+    def remove_many(self, s_class: str, objs: dict, removed: list):
+        """ Append one remove record per object, then fsync once
+        """
+        with self._lock:
+            for obj in removed:
+                self._append(s_class, objs, {"op": "remove", "id": obj.id})
+            self._sync(s_class)
+
+    def flush(self):
+        """ fsync every open log
+        """
+        with self._lock:
+            for s_class in list(self._logs):
+                self._sync(s_class)
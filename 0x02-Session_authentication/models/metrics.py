@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+""" Process-wide counters and histograms, in Prometheus text format
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Tuple
+import functools
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a dict lookup to a slow password hash
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+REGISTRY = {}
+_registry_lock = threading.Lock()
+
+
+def _labels(key: Tuple, extra: str = None) -> str:
+    """ Render a label set {a="b",...}
+    """
+    parts = ['{}="{}"'.format(k, str(v).replace('\\', '\\\\')
+                              .replace('"', '\\"').replace('\n', '\\n'))
+             for k, v in key]
+    if extra is not None:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter():
+    """ Monotonic counter, one value per label set
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        """ Initialize an empty counter
+        """
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """ Add <amount> to the value of <labels>
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """ Current value of <labels>
+        """
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        """ Yield the exposition lines of the counter
+        """
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield "{}{} {}".format(self.name, _labels(key), value)
+
+
+class _Timer():
+    """ Observe the time spent in a with block into a histogram
+    """
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram: 'Histogram', labels: dict):
+        """ Initialize for <histogram> and <labels>
+        """
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        """ Start the clock
+        """
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        """ Record the elapsed time, also when an exception is raised
+        """
+        self.histogram.observe(time.perf_counter() - self.start,
+                               **self.labels)
+
+
+class Histogram():
+    """ Distribution of observed values (seconds) in cumulative buckets
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple = None):
+        """ Initialize an empty histogram
+        """
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """ Record one observation for <labels>
+        """
+        key = tuple(sorted(labels.items()))
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][slot] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels) -> _Timer:
+        """ Context manager observing the duration of its block
+        """
+        return _Timer(self, labels)
+
+    def timed(self, **labels) -> Callable:
+        """ Decorator observing the duration of each call
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, **labels) -> int:
+        """ Number of observations of <labels>
+        """
+        entry = self._values.get(tuple(sorted(labels.items())))
+        return entry[2] if entry else 0
+
+    def samples(self):
+        """ Yield the exposition lines of the histogram
+        """
+        with self._lock:
+            values = [(key, list(counts), total, count)
+                      for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                yield "{}_bucket{} {}".format(
+                    self.name, _labels(key, 'le="{}"'.format(bound)),
+                    cumulative)
+            yield "{}_bucket{} {}".format(
+                self.name, _labels(key, 'le="+Inf"'), count)
+            yield "{}_sum{} {}".format(self.name, _labels(key), total)
+            yield "{}_count{} {}".format(self.name, _labels(key), count)
+
+
+class Gauge():
+    """ Value read from a callback when the metrics are rendered
+    """
+
+    def __init__(self, name: str, help: str,
+                 func: Callable[[], Dict[Tuple, float]], kind: str):
+        """ Initialize with <func>, returning {label items: value}
+        """
+        self.name = name
+        self.help = help
+        self.func = func
+        self.kind = kind
+
+    def samples(self):
+        """ Yield the exposition lines of the gauge
+        """
+        for key, value in self.func().items():
+            yield "{}{} {}".format(self.name, _labels(key), value)
+
+
+def _register(name: str, factory: Callable):
+    """ Return the metric called <name>, creating it with <factory>
+    """
+    metric = REGISTRY.get(name)
+    if metric is None:
+        with _registry_lock:
+            metric = REGISTRY.get(name)
+            if metric is None:
+                metric = REGISTRY[name] = factory()
+    return metric
+
+
+def counter(name: str, help: str) -> Counter:
+    """ Return the counter called <name>
+    """
+    return _register(name, lambda: Counter(name, help))
+
+
+def histogram(name: str, help: str, buckets: Tuple = None) -> Histogram:
+    """ Return the histogram called <name>
+    """
+    return _register(name, lambda: Histogram(name, help, buckets))
+
+
+def gauge(name: str, help: str, func: Callable[[], Dict[Tuple, float]],
+          kind: str = "gauge") -> Gauge:
+    """ Register (or replace) a callback metric called <name>; <kind> is
+    "counter" for callbacks returning running totals
+    """
+    with _registry_lock:
+        REGISTRY[name] = Gauge(name, help, func, kind)
+    return REGISTRY[name]
+
+
+def render() -> str:
+    """ Every registered metric in Prometheus text exposition format
+    """
+    lines = []
+    for name in sorted(REGISTRY):
+        metric = REGISTRY[name]
+        lines.append("# HELP {} {}".format(name, metric.help))
+        lines.append("# TYPE {} {}".format(name, metric.kind))
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+""" Password hashing schemes
+"""
+from abc import ABC, abstractmethod
+import base64
+import hashlib
+import hmac
+import os
+import re
+import time
+from typing import Dict, Optional
+
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+
+class PasswordScheme(ABC):
+    """ Base class of a password hashing scheme
+    """
+    name = None
+    verify_only = False
+
+    def identify(self, stored: str) -> bool:
+        """ Return True if <stored> was produced by this scheme
+        """
+        return stored.startswith("{}$".format(self.name))
+
+    @abstractmethod
+    def hash(self, pwd: str) -> str:
+        """ Hash <pwd> with the current cost settings
+        """
+
+    @abstractmethod
+    def verify(self, pwd: str, stored: str) -> bool:
+        """ Check <pwd> against <stored>
+        """
+
+    def needs_rehash(self, stored: str) -> bool:
+        """ Return True if <stored> uses weaker settings than current ones
+        """
+        return False
+
+
+class SHA256Scheme(PasswordScheme):
+    """ Legacy unsalted SHA256 hex digest, verify only
+    """
+    name = "sha256"
+    verify_only = True
+    _HEX = re.compile(r"^[0-9a-f]{64}$")
+
+    def identify(self, stored: str) -> bool:
+        """ Legacy hashes are bare 64 character hex digests
+        """
+        return self._HEX.match(stored) is not None
+
+    def hash(self, pwd: str) -> str:
+        """ Hash <pwd> the legacy way
+        """
+        return hashlib.sha256(pwd.encode()).hexdigest().lower()
+
+    def verify(self, pwd: str, stored: str) -> bool:
+        """ Check <pwd> against a legacy digest
+        """
+        return hmac.compare_digest(self.hash(pwd), stored)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """ Legacy digests are always upgraded
+        """
+        return True
+
+
+class PBKDF2Scheme(PasswordScheme):
+    """ Salted PBKDF2-HMAC-SHA256: pbkdf2_sha256$<iterations>$<salt>$<hash>
+    """
+    name = "pbkdf2_sha256"
+
+    def __init__(self, iterations: Optional[int] = None):
+        """ Initialize with a work factor, PASSWORD_HASH_ITERATIONS by
+        default
+        """
+        if iterations is None:
+            iterations = int(os.getenv("PASSWORD_HASH_ITERATIONS", "100000"))
+        self.iterations = iterations
+
+    def _digest(self, pwd: str, salt: bytes, iterations: int) -> str:
+        """ Encoded PBKDF2 digest
+        """
+        digest = hashlib.pbkdf2_hmac("sha256", pwd.encode(), salt,
+                                     iterations)
+        return base64.b64encode(digest).decode()
+
+    def hash(self, pwd: str) -> str:
+        """ Hash <pwd> with a fresh salt
+        """
+        salt = os.urandom(16)
+        return "{}${}${}${}".format(self.name, self.iterations,
+                                    base64.b64encode(salt).decode(),
+                                    self._digest(pwd, salt, self.iterations))
+
+    def verify(self, pwd: str, stored: str) -> bool:
+        """ Check <pwd> with the salt and iterations recorded in <stored>
+        """
+        try:
+            _, iterations, salt, digest = stored.split("$")
+            expected = self._digest(pwd, base64.b64decode(salt),
+                                    int(iterations))
+        except (ValueError, TypeError):
+            return False
+        return hmac.compare_digest(expected, digest)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """ Rehash when the recorded iterations differ from current ones
+        """
+        try:
+            return int(stored.split("$")[1]) != self.iterations
+        except (IndexError, ValueError):
+            return True
+
+
+class BcryptScheme(PasswordScheme):
+    """ bcrypt hashes ($2b$<cost>$...), available when bcrypt is installed
+    """
+    name = "bcrypt"
+
+    def __init__(self, rounds: Optional[int] = None):
+        """ Initialize with a cost factor, BCRYPT_ROUNDS by default
+        """
+        if rounds is None:
+            rounds = int(os.getenv("BCRYPT_ROUNDS", "12"))
+        self.rounds = rounds
+
+    def identify(self, stored: str) -> bool:
+        """ bcrypt hashes start with $2a$, $2b$ or $2y$
+        """
+        return stored[:4] in ("$2a$", "$2b$", "$2y$")
+
+    def hash(self, pwd: str) -> str:
+        """ Hash <pwd> with a fresh salt
+        """
+        salt = bcrypt.gensalt(self.rounds)
+        return bcrypt.hashpw(pwd.encode(), salt).decode()
+
+    def verify(self, pwd: str, stored: str) -> bool:
+        """ Check <pwd> against <stored>
+        """
+        try:
+            return bcrypt.checkpw(pwd.encode(), stored.encode())
+        except ValueError:
+            return False
+
+    def needs_rehash(self, stored: str) -> bool:
+        """ Rehash when the recorded cost differs from the current one
+        """
+        try:
+            return int(stored.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+SCHEMES: Dict[str, PasswordScheme] = {
+    PBKDF2Scheme.name: PBKDF2Scheme(),
+    SHA256Scheme.name: SHA256Scheme(),
+}
+if bcrypt is not None:
+    SCHEMES[BcryptScheme.name] = BcryptScheme()
+
+DEFAULT_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", PBKDF2Scheme.name)
+if DEFAULT_SCHEME == BcryptScheme.name and bcrypt is None:
+    raise ImportError("PASSWORD_HASH_SCHEME=bcrypt requires bcrypt: "
+                      "pip install bcrypt")
+elif DEFAULT_SCHEME not in SCHEMES:
+    raise ValueError("Unknown PASSWORD_HASH_SCHEME: {}".format(DEFAULT_SCHEME))
+elif SCHEMES[DEFAULT_SCHEME].verify_only:
+    raise ValueError("PASSWORD_HASH_SCHEME={} is verify only"
+                     .format(DEFAULT_SCHEME))
+
+
+def identify(stored: str) -> Optional[PasswordScheme]:
+    """ Return the scheme that produced <stored>, None if unknown
+    """
+    if not isinstance(stored, str):
+        return None
+    for scheme in SCHEMES.values():
+        if scheme.identify(stored):
+            return scheme
+    return None
+
+
+def hash_password(pwd: str) -> str:
+    """ Hash <pwd> with the default scheme
+    """
+    return SCHEMES[DEFAULT_SCHEME].hash(pwd)
+
+
+def verify_password(pwd: str, stored: str) -> bool:
+    """ Check <pwd> against <stored>, whatever scheme produced it
+    """
+    scheme = identify(stored)
+    if scheme is None:
+        return False
+    return scheme.verify(pwd, stored)
+
+
+def needs_rehash(stored: str) -> bool:
+    """ Return True if <stored> is not in the default scheme at its
+    current cost
+    """
+    scheme = identify(stored)
+    if scheme is None:
+        return True
+    if scheme.name != DEFAULT_SCHEME:
+        return True
+    return scheme.needs_rehash(stored)
+
+
+def calibrate_iterations(target_ms: float = 100.0,
+                         probe: int = 10000) -> int:
+    """ Return the PBKDF2 iteration count that takes about <target_ms>
+    on this machine, to feed PASSWORD_HASH_ITERATIONS
+    """
+    start = time.perf_counter()
+    hashlib.pbkdf2_hmac("sha256", b"calibration", os.urandom(16), probe)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return max(probe, int(probe * target_ms / max(elapsed_ms, 1e-6)))
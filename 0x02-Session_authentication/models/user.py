@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
 """ User module
 """
-import hashlib
-from models.base import Base
+from concurrent.futures import ThreadPoolExecutor
+from models.base import Base, storage
+from models import password as passwords
+import threading
+
+# Upgrades hashes after logins, off the request threads; one task per
+# user at a time
+REHASH_EXECUTOR = ThreadPoolExecutor(max_workers=2,
+                                     thread_name_prefix="rehash")
+_rehashing = set()
+_rehashing_lock = threading.Lock()
 
 
 class User(Base):
     """ User class
     """
+    __slots__ = ('email', '_password', 'first_name', 'last_name')
+    indexes = ('email',)
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
@@ -26,22 +37,61 @@ class User(Base):
 
     @password.setter
     def password(self, pwd: str):
-        """ Setter of a new password: encrypt in SHA256
+        """ Setter of a new password: hash with the default scheme
         """
         if pwd is None or type(pwd) is not str:
             self._password = None
         else:
-            self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
+            self._password = passwords.hash_password(pwd)
 
     def is_valid_password(self, pwd: str) -> bool:
         """ Validate a password
+
+        On success, a hash produced by an older scheme or cost is
+        upgraded by REHASH_EXECUTOR so the caller doesn't wait for it;
+        logins of a user whose upgrade is pending don't queue another.
         """
         if pwd is None or type(pwd) is not str:
             return False
         if self.password is None:
             return False
-        pwd_e = pwd.encode()
-        return hashlib.sha256(pwd_e).hexdigest().lower() == self.password
+        stored = self.password
+        if not passwords.verify_password(pwd, stored):
+            return False
+        if passwords.needs_rehash(stored):
+            with _rehashing_lock:
+                if self.id in _rehashing:
+                    return True
+                _rehashing.add(self.id)
+            REHASH_EXECUTOR.submit(self._rehash_password, pwd, stored)
+        return True
+
+    def _rehash_password(self, pwd: str, stored: str):
+        """ Replace <stored> with a hash of <pwd> in the default scheme,
+        unless the password was changed meanwhile
+        """
+        try:
+            new_hash = passwords.hash_password(pwd)
+            if not self._is_stored_with(stored):
+                return
+            self._password = new_hash
+            self.save()
+        finally:
+            with _rehashing_lock:
+                _rehashing.discard(self.id)
+
+    def _is_stored_with(self, stored: str) -> bool:
+        """ Return True if this object is still the saved user and its
+        saved hash is still <stored>: a user removed or changed meanwhile
+        must not be written back
+        """
+        if self._password != stored:
+            return False
+        if storage.lazy:
+            obj_json = storage.fetch(self.__class__.__name__, self.id)
+            if obj_json is None or obj_json.get('_password') != stored:
+                return False
+        return User.get(self.id) is self
 
     def display_name(self) -> str:
         """ Display User name based on email/first_name/last_name
@@ -6,6 +6,9 @@ from models.base import Base
 
 class UserSession(Base):
     """Class to persist session ID <-> user ID"""
+    __slots__ = ('user_id', 'session_id')
+    indexes = ('session_id', 'user_id')
+
     def __init__(self, *args: list, **kwargs: dict):
         """Initialize UserSession with user_id and session_id"""
         super().__init__(*args, **kwargs)